@@ -1,22 +1,51 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
+import asyncio
+import hashlib
+import hmac
+import threading
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 from database import get_db
 from models import Admin
 from schemas import TokenData
 from config import settings
+from services.cache import TTLCache
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
 
+# bcrypt is CPU bound and slow by design: async endpoints run it here, off the event loop.
+# Extra verifications queue up instead of spreading over every core.
+password_executor = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+
+COLLECTION_ACCESS_SCOPE = "collection_access"
+
+# username -> (generation, detached Admin with its role loaded), so authenticated requests need no auth queries.
+# Cleared on admin/role writes (invalidate_principal); other workers catch up after the TTL.
+principal_cache = TTLCache(
+    maxsize=settings.AUTH_PRINCIPAL_CACHE_SIZE,
+    ttl=settings.AUTH_PRINCIPAL_CACHE_TTL_SECONDS
+)
+
+# Bumped by invalidate_principal. An entry stamped with an older generation is stale: it was
+# loaded before an admin/role write and may have been stored after that write invalidated it.
+_principal_generation = 0
+_principal_generation_lock = threading.Lock()
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify plain password with hashed password"""
     return pwd_context.verify(plain_password, hashed_password)
 
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password on the bounded bcrypt pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_executor, verify_password, plain_password, hashed_password)
+
 def get_password_hash(password: str) -> str:
     """Hash password"""
     return pwd_context.hash(password)
@@ -32,6 +61,35 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
+def _password_fingerprint(password_hash: str) -> str:
+    """Short digest of a password hash: tokens stop working once the password changes"""
+    return hashlib.sha256(password_hash.encode("utf-8")).hexdigest()[:16]
+
+def create_collection_access_token(collection_id: str, password_hash: str) -> str:
+    """Short-lived token proving the password of a password-protected collection was entered"""
+    return create_access_token(
+        {
+            "sub": collection_id,
+            "scope": COLLECTION_ACCESS_SCOPE,
+            "pwd": _password_fingerprint(password_hash),
+        },
+        expires_delta=timedelta(minutes=settings.COLLECTION_ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+
+def verify_collection_access_token(token: str, collection_id: str, password_hash: Optional[str]) -> bool:
+    """Check a token from create_collection_access_token against the collection's current password"""
+    if not token or not password_hash:
+        return False
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        return False
+    return (
+        payload.get("scope") == COLLECTION_ACCESS_SCOPE
+        and payload.get("sub") == collection_id
+        and hmac.compare_digest(str(payload.get("pwd", "")), _password_fingerprint(password_hash))
+    )
+
 def authenticate_admin(db: Session, username: str, password: str):
     """Authenticate admin user"""
     admin = db.query(Admin).filter(Admin.username == username).first()
@@ -58,17 +116,48 @@ async def get_current_admin(
         username: str = payload.get("sub")
         role_id: str = payload.get("role_id")
         role_slug: str = payload.get("role_slug")
-        if username is None:
+        if username is None or payload.get("scope") is not None:  # Scoped tokens (collection access) aren't logins
             raise credentials_exception
         token_data = TokenData(username=username, role_id=role_id, role_slug=role_slug)
     except JWTError:
         raise credentials_exception
 
-    admin = db.query(Admin).filter(Admin.username == token_data.username).first()
+    # Read before loading, so a write committed meanwhile leaves this entry stale
+    generation = _principal_generation
+    cached = principal_cache.get(token_data.username)
+    if cached is not None and cached[0] == generation:
+        return cached[1]
+
+    admin = load_principal(db, token_data.username)
     if admin is None:
         raise credentials_exception
+    principal_cache.set(token_data.username, (generation, admin))
+    return admin
+
+def load_principal(db: Session, username: str) -> Optional[Admin]:
+    """
+    Admin with its role in one query, detached from the session so it can be shared
+    read-only by later requests (role checks don't lazy-load anymore)
+    """
+    admin = db.query(Admin).options(joinedload(Admin.role)).filter(Admin.username == username).first()
+    if admin is not None:
+        db.expunge(admin.role)
+        db.expunge(admin)
     return admin
 
+def invalidate_principal(username: Optional[str] = None) -> None:
+    """
+    Forget a cached admin (or every admin, e.g. after a role change).
+    Call after the commit: entries loaded before it are rejected by generation.
+    """
+    global _principal_generation
+    with _principal_generation_lock:
+        _principal_generation += 1
+    if username is None:
+        principal_cache.clear()
+    else:
+        principal_cache.delete(username)
+
 def require_role(required_role_slug: str):
     """
     Dependency factory to require a specific role slug
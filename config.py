@@ -6,6 +6,10 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24  # 24 hours
     ALLOW_ADMIN_REGISTRATION: bool = True  # Set to False to disable admin registration
+    COLLECTION_ACCESS_TOKEN_EXPIRE_MINUTES: int = 60  # Token issued after a password-protected collection unlock
+    PASSWORD_HASH_WORKERS: int = 2  # Threads running bcrypt, so a login/unlock surge can't take every core
+    AUTH_PRINCIPAL_CACHE_SIZE: int = 1024  # Authenticated admins (with their role) kept in memory
+    AUTH_PRINCIPAL_CACHE_TTL_SECONDS: int = 60  # Bounds how long other workers see a changed admin/role
 
     # Database Configuration
     DATABASE_URL: str = "sqlite:///./bocah_cafe.db"
@@ -19,6 +23,52 @@ class Settings(BaseSettings):
     # Single key or comma-separated multiple keys for load balancing
     # Example: "key1,key2,key3"
     GROQ_API_KEYS: Optional[str] = None
+    GROQ_BASE_URL: Optional[str] = None  # Override the API endpoint, e.g. a local fake server for tests
+    GROQ_TIMEOUT_SECONDS: float = 8.0  # Deadline of a whole parse, hedges included
+    GROQ_HEDGE_AFTER_MS: int = 800  # Fire a second key when the first is slower than this
+    GROQ_BREAKER_FAILURES: int = 3  # Consecutive failures that open a key's circuit
+    GROQ_BREAKER_RESET_SECONDS: float = 30.0  # Open circuit duration before a half-open probe
+
+    # Parsed query cache
+    PARSE_CACHE_SIZE: int = 4096
+    PARSE_CACHE_TTL_SECONDS: int = 60 * 60 * 6  # 6 hours
+    PARSE_CACHE_REDIS_URL: Optional[str] = None  # e.g. "redis://localhost:6379/0", shared by all workers (needs the redis package)
+    PARSE_BATCH_MAX_QUERIES: int = 5000  # Queries accepted by one /api/search/parse/batch call
+    PARSE_BATCH_CONCURRENCY: int = 8  # Parses of a batch running at the same time
+
+    # Timezone used for "open now" filtering of cafe opening hours
+    CAFE_TIMEZONE: str = "Asia/Jakarta"
+
+    # Cafe Listing Cache
+    LISTING_COUNT_CACHE_SIZE: int = 1024  # Number of distinct filter sets kept
+    LISTING_COUNT_CACHE_TTL_SECONDS: int = 60
+    FACILITY_INDEX_TTL_SECONDS: int = 300  # Full rebuild interval, picks up writes from other workers
+    COLLECTION_DETAIL_CAFES: int = 20  # Cafes embedded in a collection detail, the rest is paginated
+    GEO_INDEX_CELL_DEGREES: float = 0.01  # Grid cell size of the nearby index (~1.1 km)
+    GEO_INDEX_TTL_SECONDS: int = 300
+    NEARBY_MAX_RADIUS_METERS: int = 50000
+
+    # Text Search
+    TEXT_SEARCH_BACKEND: str = "auto"  # "auto", "fulltext" (MySQL), "fts5" (SQLite), "memory" (in-process BM25) or "like"
+    TEXT_INDEX_TTL_SECONDS: int = 300
+    TEXT_INDEX_MAX_DOCS: int = 200000  # Larger tables fall back to the database
+    TEXT_SEARCH_MAX_RESULTS: int = 1000  # Most relevant matches given a text score per search (all matches are returned)
+
+    # NL search relevance weights (see services/ranking.py), each feature is scaled to 0..1
+    RANK_WEIGHT_TEXT: float = 3.0
+    RANK_WEIGHT_FACILITY: float = 2.0
+    RANK_WEIGHT_RATING: float = 1.0
+    RANK_WEIGHT_REVIEWS: float = 0.5
+    RANK_WEIGHT_INTENT: float = 1.0
+
+    # Semantic search (needs numpy, falls back to text search without it)
+    NL_SEARCH_MODE: str = "text"  # "text" or "semantic": how NL search matches search_text against cafes and collections
+    VECTOR_MODEL: str = "hashing"  # "hashing" or "package.module:factory" of a local embedding model
+    VECTOR_DIM: int = 512  # Dimensions of the hashing vectorizer
+    VECTOR_INDEX_DIR: str = "vector_index"  # Where the memory-mapped embedding matrices are stored
+    VECTOR_INDEX_TTL_SECONDS: int = 300
+    VECTOR_SEARCH_TOP_K: int = 200  # Most similar rows kept per search, structured filters apply on top
+    VECTOR_MIN_SCORE: float = 0.05  # Cosine similarity below this is not a match
 
     class Config:
         env_file = ".env"
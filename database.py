@@ -1,16 +1,39 @@
+import math
 import ssl
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from config import settings
 
 DATABASE_URL = settings.DATABASE_URL
 
+
+def _async_url(url: str) -> str:
+    """Same database through an asyncio driver (aiosqlite / aiomysql)"""
+    scheme, rest = url.split("://", 1)
+    dialect = scheme.split("+", 1)[0]
+    driver = {"sqlite": "aiosqlite", "mysql": "aiomysql"}.get(dialect)
+    return f"{dialect}+{driver}://{rest}" if driver else url
+
+
+def _sqlite_ln(value):
+    return math.log(value) if value is not None and value > 0 else None
+
+
+def _register_sqlite_functions(dbapi_connection, connection_record):
+    """ln() used by relevance ranking: MySQL has it, SQLite only when built with math functions"""
+    dbapi_connection.create_function("ln", 1, _sqlite_ln, deterministic=True)
+
+
 # SQLite needs check_same_thread=False, MySQL doesn't need it
 if DATABASE_URL.startswith("sqlite"):
     engine = create_engine(
         DATABASE_URL, connect_args={"check_same_thread": False}
     )
+    async_engine = create_async_engine(_async_url(DATABASE_URL))
+    event.listen(engine, "connect", _register_sqlite_functions)
+    event.listen(async_engine.sync_engine, "connect", _register_sqlite_functions)
 else:
     # Configure SSL for Azure MySQL
     ssl_context = ssl.create_default_context()
@@ -23,9 +46,18 @@ else:
         pool_recycle=3600,
         connect_args={"ssl": ssl_context},
     )
+    async_engine = create_async_engine(
+        _async_url(DATABASE_URL),
+        pool_pre_ping=True,
+        pool_recycle=3600,
+        connect_args={"ssl": ssl_context},
+    )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async sessions for endpoints that must not hold a threadpool thread (NL search)
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 def get_db():
@@ -34,3 +66,88 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as session:
+        yield session
+
+
+# FTS5 mirrors of searchable text (SQLite only): table -> indexed columns.
+# Each "<table>_fts" is a contentless FTS5 table kept in sync by triggers. Its rowids come from
+# "<table>_fts_keys", whose INTEGER PRIMARY KEY maps to the UUID id: the implicit rowid of
+# tables with string primary keys is not stable (VACUUM may renumber it).
+FTS_TABLES = {
+    "cafes": ["nama", "alamat_lengkap"],
+    "facilities": ["name", "description"],
+    "collections": ["name", "description"],
+}
+
+def _drop_sqlite_fts(conn, table: str) -> None:
+    """Drop an FTS mirror, its key table and triggers (e.g. the earlier rowid-keyed layout)"""
+    fts = f"{table}_fts"
+    for trigger in ("ai", "ad", "au"):
+        conn.execute(text(f"DROP TRIGGER IF EXISTS {fts}_{trigger}"))
+    conn.execute(text(f"DROP TABLE IF EXISTS {fts}"))
+    conn.execute(text(f"DROP TABLE IF EXISTS {fts}_keys"))
+
+def init_sqlite_fts(bind=engine) -> bool:
+    """
+    Create FTS5 tables, key tables and sync triggers if missing, populating new tables
+    from existing rows. Returns False when not on SQLite or when SQLite was built without FTS5.
+    """
+    if bind.dialect.name != "sqlite":
+        return False
+
+    with bind.connect() as conn:
+        for table, columns in FTS_TABLES.items():
+            fts = f"{table}_fts"
+            keys = f"{fts}_keys"
+            cols = ", ".join(columns)
+            new_cols = ", ".join(f"new.{c}" for c in columns)
+            old_cols = ", ".join(f"old.{c}" for c in columns)
+            key_of = lambda row: f"(SELECT rowid FROM {keys} WHERE id = {row}.id)"
+
+            existing = {
+                row[0] for row in conn.execute(
+                    text("SELECT name FROM sqlite_master WHERE type = 'table' AND name IN (:fts, :keys)"),
+                    {"fts": fts, "keys": keys}
+                )
+            }
+            if existing != {fts, keys}:
+                _drop_sqlite_fts(conn, table)
+                try:
+                    conn.execute(text(
+                        f"CREATE VIRTUAL TABLE {fts} USING fts5({cols}, content='', "
+                        f"tokenize='unicode61 remove_diacritics 2')"
+                    ))
+                except Exception:
+                    conn.rollback()
+                    return False  # no such module: fts5
+                conn.execute(text(f"CREATE TABLE {keys} (rowid INTEGER PRIMARY KEY, id VARCHAR(36) NOT NULL UNIQUE)"))
+                conn.execute(text(f"INSERT INTO {keys} (id) SELECT id FROM {table}"))
+                conn.execute(text(
+                    f"INSERT INTO {fts} (rowid, {cols}) "
+                    f"SELECT k.rowid, {', '.join(f't.{c}' for c in columns)} FROM {table} t JOIN {keys} k ON k.id = t.id"
+                ))
+
+            # Contentless tables delete by rowid plus the old values, which the triggers have at hand
+            conn.execute(text(f"""
+                CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN
+                    INSERT INTO {keys} (id) VALUES (new.id);
+                    INSERT INTO {fts}(rowid, {cols}) VALUES ({key_of("new")}, {new_cols});
+                END
+            """))
+            conn.execute(text(f"""
+                CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN
+                    INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', {key_of("old")}, {old_cols});
+                    DELETE FROM {keys} WHERE id = old.id;
+                END
+            """))
+            conn.execute(text(f"""
+                CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON {table} BEGIN
+                    INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', {key_of("old")}, {old_cols});
+                    INSERT INTO {fts}(rowid, {cols}) VALUES ({key_of("new")}, {new_cols});
+                END
+            """))
+        conn.commit()
+    return True
@@ -4,11 +4,12 @@ from fastapi.responses import JSONResponse
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
-from database import engine, Base
+from database import engine, Base, init_sqlite_fts
 from routers import cafe, auth, upload, admin, role, facility, collection, search
 
-# Create database tables
+# Create database tables (and the FTS5 search mirrors on SQLite)
 Base.metadata.create_all(bind=engine)
+init_sqlite_fts(engine)
 
 # Setup rate limiter
 limiter = Limiter(key_func=get_remote_address, default_limits=["100/minute"])
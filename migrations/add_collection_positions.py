@@ -0,0 +1,104 @@
+"""
+Migration: Add position column to collection_cafes
+
+Stores the curated order of the cafes in a collection, used by the paginated
+/api/collections/{id}/cafes endpoint (keyset on collection_id, position).
+Existing memberships are numbered by cafe name, the order they were shown in before.
+Works on both SQLite and MySQL.
+
+Run this migration manually after deploying:
+    python migrations/add_collection_positions.py
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text, inspect
+from database import engine
+
+INDEX_NAME = "ix_collection_cafes_position"
+
+
+def backfill(conn):
+    """Number the cafes of every collection 0..n-1 by cafe name"""
+    rows = conn.execute(text(
+        "SELECT cc.collection_id, cc.cafe_id FROM collection_cafes cc "
+        "JOIN cafes c ON c.id = cc.cafe_id "
+        "ORDER BY cc.collection_id, c.nama, c.id"
+    )).fetchall()
+
+    updates = []
+    positions = {}
+    for collection_id, cafe_id in rows:
+        position = positions.get(collection_id, 0)
+        positions[collection_id] = position + 1
+        updates.append({"collection_id": collection_id, "cafe_id": cafe_id, "position": position})
+
+    if updates:
+        conn.execute(
+            text("UPDATE collection_cafes SET position = :position "
+                 "WHERE collection_id = :collection_id AND cafe_id = :cafe_id"),
+            updates
+        )
+    print(f"Backfilled {len(updates)} memberships in {len(positions)} collections")
+
+
+def run_migration():
+    """Add position column, its index, and backfill"""
+    print("Running collection positions migration...")
+
+    inspector = inspect(engine)
+    existing_columns = {c["name"] for c in inspector.get_columns("collection_cafes")}
+    existing_indexes = {i["name"] for i in inspector.get_indexes("collection_cafes")}
+
+    with engine.connect() as conn:
+        if "position" in existing_columns:
+            print("Column collection_cafes.position already exists")
+        else:
+            conn.execute(text("ALTER TABLE collection_cafes ADD COLUMN position INTEGER NOT NULL DEFAULT 0"))
+            print("Added column collection_cafes.position")
+            backfill(conn)
+
+        if INDEX_NAME in existing_indexes:
+            print(f"Index {INDEX_NAME} already exists")
+        else:
+            conn.execute(text(f"CREATE INDEX {INDEX_NAME} ON collection_cafes (collection_id, position)"))
+            print(f"Created index {INDEX_NAME}")
+
+        conn.commit()
+        print("Migration completed!")
+
+
+def rollback_migration():
+    """Remove position column and its index"""
+    print("Rolling back collection positions...")
+
+    with engine.connect() as conn:
+        try:
+            conn.execute(text(f"DROP INDEX {INDEX_NAME} ON collection_cafes")
+                         if engine.dialect.name == "mysql" else text(f"DROP INDEX {INDEX_NAME}"))
+            print(f"Dropped {INDEX_NAME}")
+        except Exception as e:
+            print(f"Could not drop {INDEX_NAME}: {e}")
+
+        try:
+            conn.execute(text("ALTER TABLE collection_cafes DROP COLUMN position"))
+            print("Dropped column collection_cafes.position")
+        except Exception as e:
+            print(f"Could not drop collection_cafes.position: {e}")
+
+        conn.commit()
+        print("Rollback completed!")
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Collection positions migration")
+    parser.add_argument("--rollback", action="store_true", help="Rollback the migration")
+    args = parser.parse_args()
+
+    if args.rollback:
+        rollback_migration()
+    else:
+        run_migration()
@@ -0,0 +1,67 @@
+"""
+Migration: Add latitude / longitude columns to cafes
+
+Adds nullable coordinate columns, filled by the cafe create/update/bulk endpoints
+(e.g. from Google Maps scrapes). They are not indexed in the database: nearby
+queries go through the in-memory grid of services/geo_index.py.
+Works on both SQLite and MySQL.
+
+Run this migration manually after deploying:
+    python migrations/add_coordinates.py
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text, inspect
+from database import engine
+
+COLUMNS = ["latitude", "longitude"]
+
+
+def run_migration():
+    """Add coordinate columns"""
+    print("Running coordinates migration...")
+
+    inspector = inspect(engine)
+    existing_columns = {c["name"] for c in inspector.get_columns("cafes")}
+
+    with engine.connect() as conn:
+        for column in COLUMNS:
+            if column in existing_columns:
+                print(f"Column cafes.{column} already exists")
+            else:
+                conn.execute(text(f"ALTER TABLE cafes ADD COLUMN {column} DOUBLE NULL"))
+                print(f"Added column cafes.{column}")
+
+        conn.commit()
+        print("Migration completed!")
+
+
+def rollback_migration():
+    """Remove coordinate columns"""
+    print("Rolling back coordinates...")
+
+    with engine.connect() as conn:
+        for column in COLUMNS:
+            try:
+                conn.execute(text(f"ALTER TABLE cafes DROP COLUMN {column}"))
+                print(f"Dropped column cafes.{column}")
+            except Exception as e:
+                print(f"Could not drop cafes.{column}: {e}")
+
+        conn.commit()
+        print("Rollback completed!")
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Coordinates migration")
+    parser.add_argument("--rollback", action="store_true", help="Rollback the migration")
+    args = parser.parse_args()
+
+    if args.rollback:
+        rollback_migration()
+    else:
+        run_migration()
@@ -2,6 +2,7 @@
 Migration: Add Full-Text Search Index for MySQL
 
 This migration adds FULLTEXT indexes to improve search performance on MySQL.
+They are queried with MATCH ... AGAINST by services/text_search.py.
 For SQLite (development), this migration will be skipped.
 
 Run this migration manually after deploying to production:
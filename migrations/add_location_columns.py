@@ -0,0 +1,109 @@
+"""
+Migration: Add normalized city / district columns to cafes
+
+Adds indexed columns derived from the free text alamat_lengkap through the gazetteer
+(e.g. "Jl. Kemang Raya No. 8, Jakarta Selatan" -> "Jakarta Selatan" / "Kemang")
+and backfills existing rows. Works on both SQLite and MySQL.
+
+Run this migration manually after deploying:
+    python migrations/add_location_columns.py
+
+Re-run with --backfill-only after extending services/gazetteer.py.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text, inspect
+from database import engine
+from services.gazetteer import locate_address
+
+
+COLUMNS = ["city", "district"]
+
+
+def backfill(conn):
+    """Locate alamat_lengkap of every cafe into city / district"""
+    rows = conn.execute(text("SELECT id, alamat_lengkap FROM cafes")).fetchall()
+    updates = []
+    for cafe_id, alamat_lengkap in rows:
+        city, district = locate_address(alamat_lengkap)
+        updates.append({"id": cafe_id, "city": city, "district": district})
+
+    if updates:
+        conn.execute(
+            text("UPDATE cafes SET city = :city, district = :district WHERE id = :id"),
+            updates
+        )
+    located = sum(1 for u in updates if u["city"] is not None)
+    print(f"Backfilled {len(updates)} cafes ({located} with a recognized city)")
+
+
+def run_migration():
+    """Add location columns, their indexes, and backfill from alamat_lengkap"""
+    print("Running location columns migration...")
+
+    inspector = inspect(engine)
+    existing_columns = {c["name"] for c in inspector.get_columns("cafes")}
+    existing_indexes = {i["name"] for i in inspector.get_indexes("cafes")}
+
+    with engine.connect() as conn:
+        for column in COLUMNS:
+            if column in existing_columns:
+                print(f"Column cafes.{column} already exists")
+            else:
+                conn.execute(text(f"ALTER TABLE cafes ADD COLUMN {column} VARCHAR(100) NULL"))
+                print(f"Added column cafes.{column}")
+
+            index_name = f"ix_cafes_{column}"
+            if index_name in existing_indexes:
+                print(f"Index {index_name} already exists")
+            else:
+                conn.execute(text(f"CREATE INDEX {index_name} ON cafes ({column})"))
+                print(f"Created index {index_name}")
+
+        backfill(conn)
+        conn.commit()
+        print("Migration completed!")
+
+
+def rollback_migration():
+    """Remove location columns and their indexes"""
+    print("Rolling back location columns...")
+
+    with engine.connect() as conn:
+        for column in COLUMNS:
+            index_name = f"ix_cafes_{column}"
+            try:
+                conn.execute(text(f"DROP INDEX {index_name} ON cafes")
+                             if engine.dialect.name == "mysql" else text(f"DROP INDEX {index_name}"))
+                print(f"Dropped {index_name}")
+            except Exception as e:
+                print(f"Could not drop {index_name}: {e}")
+
+            try:
+                conn.execute(text(f"ALTER TABLE cafes DROP COLUMN {column}"))
+                print(f"Dropped column cafes.{column}")
+            except Exception as e:
+                print(f"Could not drop cafes.{column}: {e}")
+
+        conn.commit()
+        print("Rollback completed!")
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Location columns migration")
+    parser.add_argument("--rollback", action="store_true", help="Rollback the migration")
+    parser.add_argument("--backfill-only", action="store_true", help="Only re-locate alamat_lengkap into existing columns")
+    args = parser.parse_args()
+
+    if args.rollback:
+        rollback_migration()
+    elif args.backfill_only:
+        with engine.connect() as conn:
+            backfill(conn)
+            conn.commit()
+    else:
+        run_migration()
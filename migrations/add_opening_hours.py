@@ -0,0 +1,78 @@
+"""
+Migration: Add structured opening hours (cafe_opening_hours)
+
+Creates the cafe_opening_hours table, which stores the opening intervals of every cafe
+as minutes since Monday 00:00 parsed from the free text jam_buka
+(e.g. "07:00 - 22:00" -> one interval per weekday), and backfills existing rows.
+Works on both SQLite and MySQL.
+
+Run this migration manually after deploying:
+    python migrations/add_opening_hours.py
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from database import engine
+from models import CafeOpeningHour
+from services.opening_hours import week_intervals
+
+
+def backfill(conn):
+    """Re-parse jam_buka of every cafe into cafe_opening_hours"""
+    rows = conn.execute(text("SELECT id, jam_buka FROM cafes")).fetchall()
+
+    conn.execute(CafeOpeningHour.__table__.delete())
+
+    inserts = []
+    unparsed = 0
+    for cafe_id, jam_buka in rows:
+        intervals = week_intervals(jam_buka)
+        if intervals is None:
+            unparsed += 1
+            continue
+        for start, end in intervals:
+            inserts.append({"cafe_id": cafe_id, "start_minute": start, "end_minute": end})
+
+    if inserts:
+        conn.execute(CafeOpeningHour.__table__.insert(), inserts)
+    print(f"Backfilled {len(rows)} cafes into {len(inserts)} intervals ({unparsed} with unparsable jam_buka)")
+
+
+def run_migration():
+    """Create cafe_opening_hours and backfill from jam_buka"""
+    print("Running opening hours migration...")
+
+    CafeOpeningHour.__table__.create(engine, checkfirst=True)
+    print("Table cafe_opening_hours is ready")
+
+    with engine.connect() as conn:
+        backfill(conn)
+        conn.commit()
+        print("Migration completed!")
+
+
+def rollback_migration():
+    """Drop cafe_opening_hours"""
+    print("Rolling back opening hours...")
+    CafeOpeningHour.__table__.drop(engine, checkfirst=True)
+    print("Rollback completed!")
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Opening hours migration")
+    parser.add_argument("--rollback", action="store_true", help="Rollback the migration")
+    parser.add_argument("--backfill-only", action="store_true", help="Only re-parse jam_buka into cafe_opening_hours")
+    args = parser.parse_args()
+
+    if args.rollback:
+        rollback_migration()
+    elif args.backfill_only:
+        with engine.connect() as conn:
+            backfill(conn)
+            conn.commit()
+    else:
+        run_migration()
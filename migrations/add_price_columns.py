@@ -0,0 +1,107 @@
+"""
+Migration: Add numeric price_min / price_max columns to cafes
+
+Adds indexed integer columns parsed from the free text range_price
+(e.g. "Rp 18.000 - Rp 45.000" -> 18000 / 45000) and backfills existing rows.
+Works on both SQLite and MySQL.
+
+Run this migration manually after deploying:
+    python migrations/add_price_columns.py
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text, inspect
+from database import engine
+from services.price_range import parse_range_price
+
+
+COLUMNS = ["price_min", "price_max"]
+
+
+def backfill(conn):
+    """Parse range_price of every cafe into price_min / price_max"""
+    rows = conn.execute(text("SELECT id, range_price FROM cafes")).fetchall()
+    updates = []
+    for cafe_id, range_price in rows:
+        price_min, price_max = parse_range_price(range_price)
+        updates.append({"id": cafe_id, "price_min": price_min, "price_max": price_max})
+
+    if updates:
+        conn.execute(
+            text("UPDATE cafes SET price_min = :price_min, price_max = :price_max WHERE id = :id"),
+            updates
+        )
+    parsed = sum(1 for u in updates if u["price_min"] is not None or u["price_max"] is not None)
+    print(f"Backfilled {len(updates)} cafes ({parsed} with a parsable range_price)")
+
+
+def run_migration():
+    """Add price columns, their indexes, and backfill from range_price"""
+    print("Running price columns migration...")
+
+    inspector = inspect(engine)
+    existing_columns = {c["name"] for c in inspector.get_columns("cafes")}
+    existing_indexes = {i["name"] for i in inspector.get_indexes("cafes")}
+
+    with engine.connect() as conn:
+        for column in COLUMNS:
+            if column in existing_columns:
+                print(f"Column cafes.{column} already exists")
+            else:
+                conn.execute(text(f"ALTER TABLE cafes ADD COLUMN {column} INTEGER NULL"))
+                print(f"Added column cafes.{column}")
+
+            index_name = f"ix_cafes_{column}"
+            if index_name in existing_indexes:
+                print(f"Index {index_name} already exists")
+            else:
+                conn.execute(text(f"CREATE INDEX {index_name} ON cafes ({column})"))
+                print(f"Created index {index_name}")
+
+        backfill(conn)
+        conn.commit()
+        print("Migration completed!")
+
+
+def rollback_migration():
+    """Remove price columns and their indexes"""
+    print("Rolling back price columns...")
+
+    with engine.connect() as conn:
+        for column in COLUMNS:
+            index_name = f"ix_cafes_{column}"
+            try:
+                conn.execute(text(f"DROP INDEX {index_name} ON cafes")
+                             if engine.dialect.name == "mysql" else text(f"DROP INDEX {index_name}"))
+                print(f"Dropped {index_name}")
+            except Exception as e:
+                print(f"Could not drop {index_name}: {e}")
+
+            try:
+                conn.execute(text(f"ALTER TABLE cafes DROP COLUMN {column}"))
+                print(f"Dropped column cafes.{column}")
+            except Exception as e:
+                print(f"Could not drop cafes.{column}: {e}")
+
+        conn.commit()
+        print("Rollback completed!")
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Price columns migration")
+    parser.add_argument("--rollback", action="store_true", help="Rollback the migration")
+    parser.add_argument("--backfill-only", action="store_true", help="Only re-parse range_price into existing columns")
+    args = parser.parse_args()
+
+    if args.rollback:
+        rollback_migration()
+    elif args.backfill_only:
+        with engine.connect() as conn:
+            backfill(conn)
+            conn.commit()
+    else:
+        run_migration()
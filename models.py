@@ -1,7 +1,10 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Boolean, Table
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Boolean, Table, Index
+from sqlalchemy.orm import relationship, validates
 from sqlalchemy.sql import func
 from database import Base
+from services.price_range import parse_range_price
+from services.opening_hours import week_intervals
+from services.gazetteer import locate_address
 import uuid
 
 def generate_uuid():
@@ -20,7 +23,10 @@ collection_cafes = Table(
     'collection_cafes',
     Base.metadata,
     Column('collection_id', String(36), ForeignKey('collections.id', ondelete='CASCADE'), primary_key=True),
-    Column('cafe_id', String(36), ForeignKey('cafes.id', ondelete='CASCADE'), primary_key=True)
+    Column('cafe_id', String(36), ForeignKey('cafes.id', ondelete='CASCADE'), primary_key=True),
+    # Curated order inside the collection, written by services/collection_listing.py
+    Column('position', Integer, nullable=False, default=0, server_default='0'),
+    Index('ix_collection_cafes_position', 'collection_id', 'position')
 )
 
 class Facility(Base):
@@ -47,15 +53,59 @@ class Cafe(Base):
     link_website = Column(String(500))
     rating = Column(Float)
     range_price = Column(String(100))
+    price_min = Column(Integer, index=True)  # Parsed from range_price (Rupiah)
+    price_max = Column(Integer, index=True)  # Parsed from range_price (Rupiah)
     count_google_review = Column(Integer)
     jam_buka = Column(String(255))
     alamat_lengkap = Column(String(500))
+    city = Column(String(100), index=True)  # Normalized from alamat_lengkap (services/gazetteer.py)
+    district = Column(String(100), index=True)  # Normalized from alamat_lengkap, e.g. "Kemang"
+    latitude = Column(Float(precision=53))  # Double, searched through the in-memory grid (services/geo_index.py)
+    longitude = Column(Float(precision=53))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     # Relationships
     facilities = relationship("Facility", secondary=cafe_facilities, back_populates="cafes")
     collections = relationship("Collection", secondary=collection_cafes, back_populates="cafes")
+    opening_hours = relationship("CafeOpeningHour", back_populates="cafe", cascade="all, delete-orphan")
+
+    @validates('range_price')
+    def _parse_range_price(self, key, value):
+        """Keep price_min/price_max in sync with the free text range_price"""
+        self.price_min, self.price_max = parse_range_price(value)
+        return value
+
+    @validates('jam_buka')
+    def _parse_jam_buka(self, key, value):
+        """Keep the structured opening hours in sync with the free text jam_buka"""
+        intervals = week_intervals(value) or []
+        self.opening_hours = [
+            CafeOpeningHour(start_minute=start, end_minute=end) for start, end in intervals
+        ]
+        return value
+
+    @validates('alamat_lengkap')
+    def _locate_alamat_lengkap(self, key, value):
+        """Keep city/district in sync with the free text alamat_lengkap"""
+        self.city, self.district = locate_address(value)
+        return value
+
+class CafeOpeningHour(Base):
+    """Opening interval of a cafe, in minutes since Monday 00:00 (parsed from jam_buka)"""
+    __tablename__ = "cafe_opening_hours"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    cafe_id = Column(String(36), ForeignKey('cafes.id', ondelete='CASCADE'), index=True, nullable=False)
+    start_minute = Column(Integer, nullable=False)  # Inclusive
+    end_minute = Column(Integer, nullable=False)  # Exclusive
+
+    # Relationship
+    cafe = relationship("Cafe", back_populates="opening_hours")
+
+    __table_args__ = (
+        Index('ix_cafe_opening_hours_range', 'start_minute', 'end_minute'),
+    )
 
 class Role(Base):
     __tablename__ = "roles"
@@ -100,4 +150,6 @@ class Collection(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     # Relationship
-    cafes = relationship("Cafe", secondary=collection_cafes, back_populates="collections")
+    cafes = relationship(
+        "Cafe", secondary=collection_cafes, back_populates="collections", order_by=collection_cafes.c.position
+    )
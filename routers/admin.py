@@ -13,7 +13,7 @@ from schemas import (
     PaginatedResponse,
     ApiResponse
 )
-from auth_utils import get_password_hash, get_superadmin
+from auth_utils import get_password_hash, get_superadmin, invalidate_principal
 
 router = APIRouter()
 
@@ -153,6 +153,8 @@ async def update_admin(
                             detail="Cannot demote the last superadmin. Promote another admin first."
                         )
 
+    previous_username = admin.username
+
     # Check if new username already exists (if username is being updated)
     if admin_update.username and admin_update.username != admin.username:
         existing_admin = db.query(Admin).filter(Admin.username == admin_update.username).first()
@@ -179,6 +181,7 @@ async def update_admin(
         admin.role_id = admin_update.role_id
 
     db.commit()
+    invalidate_principal(previous_username)
     db.refresh(admin)
     return {"data": admin, "message": "Admin updated successfully"}
 
@@ -223,6 +226,7 @@ async def update_admin_role(
 
     admin.role_id = role_update.role_id
     db.commit()
+    invalidate_principal(admin.username)
     db.refresh(admin)
     return {"data": admin, "message": "Admin role updated successfully"}
 
@@ -261,6 +265,8 @@ async def delete_admin(
                     detail="Cannot delete the last superadmin"
                 )
 
+    username = admin.username
     db.delete(admin)
     db.commit()
+    invalidate_principal(username)
     return None
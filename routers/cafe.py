@@ -1,49 +1,89 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import or_, asc, desc, case
-from typing import Optional, Literal
+from sqlalchemy import asc, desc, case
+from typing import Optional, Literal, List
 from math import ceil
 from database import get_db
 from models import Cafe, Admin, Facility
 from schemas import (
     CafeCreate, CafeUpdate, CafeResponse, PaginatedResponse, ApiResponse,
-    CafeBulkCreate, CafeBulkResponse, CafeBulkResultItem
+    CafeBulkCreate, CafeBulkResponse, CafeBulkResultItem, CafeFacetsResponse, CafeNearbyResponse
 )
 from auth_utils import get_current_admin
+from services.facility_index import facility_index
+from services.geo_index import geo_index
+from config import settings
+from services.opening_hours import resolve_open_minute
+from services.text_search import invalidate_text_index
+from services.vector_index import invalidate_vector_index
+from services.cafe_listing import (
+    SORT_FIELDS, CafeListFilters, build_filter_query, search_match, count_cafes,
+    load_cafes_by_ids, compute_facets, encode_cursor, apply_cursor, invalidate_cafe_caches
+)
 
 router = APIRouter()
 
-# Valid sort fields
-SORT_FIELDS = {
-    "rating": Cafe.rating,
-    "nama": Cafe.nama,
-    "reviews": Cafe.count_google_review,
-    "terbaru": Cafe.created_at
-}
-
-
-# Public endpoint - List all cafes
-@router.get("/", response_model=PaginatedResponse[CafeResponse])
-def get_all_cafes(
-    # Pagination
-    page: int = Query(1, ge=1, description="Page number (starts from 1)"),
-    page_size: int = Query(10, ge=1, le=100, description="Number of items per page"),
 
+def get_cafe_list_filters(
     # Search
     search: Optional[str] = Query(None, description="Search in cafe name and address"),
 
     # Filters
     nama: Optional[str] = Query(None, description="Filter by cafe name"),
     alamat: Optional[str] = Query(None, description="Filter by address"),
+    city: Optional[str] = Query(None, description="Filter by city or district, synonyms allowed (e.g. 'Jakarta Selatan', 'jaksel', 'Kemang')"),
     min_rating: Optional[float] = Query(None, ge=0, le=5, description="Minimum rating (0-5)"),
     max_rating: Optional[float] = Query(None, ge=0, le=5, description="Maximum rating (0-5)"),
     min_reviews: Optional[int] = Query(None, ge=0, description="Minimum number of Google reviews"),
+    min_price: Optional[int] = Query(None, ge=0, description="Minimum budget in Rupiah (matches overlapping price ranges)"),
+    max_price: Optional[int] = Query(None, ge=0, description="Maximum budget in Rupiah (matches overlapping price ranges)"),
     facility_slugs: Optional[str] = Query(None, description="Filter by facility slugs (comma-separated, e.g., 'wifi,mushola,ac')"),
+    open_now: bool = Query(False, description="Only cafes that are open right now"),
+    open_at: Optional[str] = Query(None, description="Only cafes open at this time today (HH:MM, e.g. '21:30')"),
+) -> CafeListFilters:
+    """Query params shared by the cafe listing and facets endpoints"""
+    try:
+        open_minute = resolve_open_minute(open_now, open_at)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    return CafeListFilters.from_params(
+        search=search,
+        nama=nama,
+        alamat=alamat,
+        city=city,
+        min_rating=min_rating,
+        max_rating=max_rating,
+        min_reviews=min_reviews,
+        min_price=min_price,
+        max_price=max_price,
+        open_minute=open_minute,
+        facility_slugs=facility_slugs
+    )
+
+
+# Public endpoint - List all cafes
+@router.get("/", response_model=PaginatedResponse[CafeResponse])
+def get_all_cafes(
+    # Pagination
+    page: int = Query(1, ge=1, description="Page number (starts from 1)"),
+    page_size: int = Query(10, ge=1, le=100, description="Number of items per page"),
+    cursor: Optional[str] = Query(None, description="Resume after this cursor (from meta.next_cursor) instead of using page"),
+
+    # Search & filters
+    filters: CafeListFilters = Depends(get_cafe_list_filters),
 
     # Sorting
     sort_by: Literal["rating", "nama", "reviews", "terbaru"] = Query("rating", description="Sort by field"),
     sort_order: Literal["asc", "desc"] = Query("desc", description="Sort order"),
 
+    # Total count
+    include_total: bool = Query(True, description="Set to false to skip counting the total"),
+    total_mode: Literal["exact", "estimate"] = Query("exact", alias="total", description="exact or estimate (optimizer row estimate on MySQL)"),
+
     db: Session = Depends(get_db)
 ):
     """
@@ -55,64 +95,68 @@ def get_all_cafes(
     **Filters:**
     - `nama`: Filter by cafe name (partial match)
     - `alamat`: Filter by address (partial match)
+    - `city`: Filter by city or district ("jaksel", "Kemang"; "jakarta" covers the five Jakarta cities)
     - `min_rating` / `max_rating`: Filter by rating range
     - `min_reviews`: Filter popular cafes by minimum review count
+    - `min_price` / `max_price`: Filter by budget in Rupiah (price range overlaps the budget)
+    - `open_now` / `open_at`: Filter cafes open right now or at a time today (parsed from jam_buka)
     - `facility_slugs`: Filter by facilities (comma-separated)
 
     **Sorting:**
     - `sort_by`: rating, nama, reviews, terbaru
     - `sort_order`: asc, desc
-    """
-    query = db.query(Cafe).options(joinedload(Cafe.facilities))
-
-    # Search filter (searches in nama AND alamat)
-    if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            or_(
-                Cafe.nama.ilike(search_term),
-                Cafe.alamat_lengkap.ilike(search_term)
-            )
-        )
-
-    # Individual filters
-    if nama:
-        query = query.filter(Cafe.nama.ilike(f"%{nama}%"))
-
-    if alamat:
-        query = query.filter(Cafe.alamat_lengkap.ilike(f"%{alamat}%"))
 
-    if min_rating is not None:
-        query = query.filter(Cafe.rating >= min_rating)
+    **Cursor pagination:**
+    Pass `meta.next_cursor` back as `cursor` to get the next page.
+    Deep pages cost the same as the first one; `page` is ignored when `cursor` is set.
 
-    if max_rating is not None:
-        query = query.filter(Cafe.rating <= max_rating)
-
-    if min_reviews is not None:
-        query = query.filter(Cafe.count_google_review >= min_reviews)
-
-    # Facility filter
-    if facility_slugs:
-        slugs = [s.strip() for s in facility_slugs.split(",") if s.strip()]
-        for slug in slugs:
-            query = query.filter(Cafe.facilities.any(Facility.slug == slug))
+    **Total count:**
+    - `include_total=false`: skip the count, `meta.total` and `meta.total_pages` are null
+    - `total=estimate`: use a cheap row estimate when available (`meta.total_estimated` is true)
+    """
+    # Phase 1 picks the page of cafe ids with a narrow query, phase 2 hydrates them.
+    # The text search runs once, for both the page and the count.
+    match = search_match(db, filters)
+    query = build_filter_query(db, filters, match).with_entities(Cafe.id)
 
-    # Get total count before pagination
-    total = query.distinct().count()
+    # Get total count before pagination (cached per filter set)
+    total = None
+    total_estimated = False
+    if include_total:
+        total, total_estimated = count_cafes(db, filters, estimate=(total_mode == "estimate"), match=match)
 
     # Apply sorting (MySQL compatible - NULLS LAST using CASE)
     sort_column = SORT_FIELDS.get(sort_by, Cafe.rating)
     nulls_last_order = case((sort_column.is_(None), 1), else_=0)
     if sort_order == "desc":
-        query = query.order_by(nulls_last_order, desc(sort_column), Cafe.nama)
+        query = query.order_by(nulls_last_order, desc(sort_column), Cafe.nama, Cafe.id)
     else:
-        query = query.order_by(nulls_last_order, asc(sort_column), Cafe.nama)
+        query = query.order_by(nulls_last_order, asc(sort_column), Cafe.nama, Cafe.id)
 
-    # Pagination
-    offset = (page - 1) * page_size
-    cafes = query.distinct().offset(offset).limit(page_size).all()
+    # Pagination (keyset when cursor is given, offset otherwise)
+    if cursor:
+        try:
+            query = apply_cursor(query, cursor, sort_by, sort_order)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+    else:
+        query = query.offset((page - 1) * page_size)
+
+    # Fetch one extra id to know whether there is a next page
+    cafe_ids = [row.id for row in query.limit(page_size + 1).all()]
+    has_next = len(cafe_ids) > page_size
+    cafes = load_cafes_by_ids(db, cafe_ids[:page_size])
+
+    next_cursor = None
+    if has_next and cafes:
+        next_cursor = encode_cursor(db, cafes[-1], sort_by)
 
-    total_pages = ceil(total / page_size) if total > 0 else 0
+    total_pages = None
+    if total is not None:
+        total_pages = ceil(total / page_size) if total > 0 else 0
 
     return {
         "data": cafes,
@@ -120,8 +164,61 @@ def get_all_cafes(
             "total": total,
             "page": page,
             "page_size": page_size,
-            "total_pages": total_pages
+            "total_pages": total_pages,
+            "next_cursor": next_cursor,
+            "total_estimated": total_estimated
+        }
+    }
+
+# Public endpoint - Facet counts for the filter panel
+@router.get("/facets", response_model=ApiResponse[CafeFacetsResponse])
+def get_cafe_facets(
+    filters: CafeListFilters = Depends(get_cafe_list_filters),
+    db: Session = Depends(get_db)
+):
+    """
+    Get cafe counts per facility, rating bucket and price category.
+    Accepts the same filters as the cafe list, so the badges match the list results.
+    Public endpoint - no authentication required.
+    """
+    return {"data": compute_facets(db, filters)}
+
+# Public endpoint - Cafes around a point
+@router.get("/nearby", response_model=ApiResponse[List[CafeNearbyResponse]])
+def get_nearby_cafes(
+    lat: float = Query(..., ge=-90, le=90, description="Latitude of the point"),
+    lng: float = Query(..., ge=-180, le=180, description="Longitude of the point"),
+    radius: int = Query(2000, ge=1, le=settings.NEARBY_MAX_RADIUS_METERS, description="Search radius in meters"),
+    limit: int = Query(20, ge=1, le=100, description="Maximum number of cafes"),
+    filters: CafeListFilters = Depends(get_cafe_list_filters),
+    db: Session = Depends(get_db)
+):
+    """
+    Get the cafes within `radius` meters of a point, nearest first.
+    Accepts the same filters as the cafe list. Cafes without coordinates are never returned.
+    Public endpoint - no authentication required.
+    """
+    # Candidates come from the in-memory grid, the database only applies the filters
+    nearby = geo_index.within(db, lat, lng, radius)
+    if nearby and filters.model_dump(exclude_defaults=True):
+        matching = {
+            row.id for row in build_filter_query(db, filters).with_entities(Cafe.id).filter(
+                Cafe.id.in_([cafe_id for cafe_id, _ in nearby])
+            ).all()
         }
+        nearby = [(cafe_id, distance) for cafe_id, distance in nearby if cafe_id in matching]
+    nearby = nearby[:limit]
+
+    distances = dict(nearby)
+    cafes = load_cafes_by_ids(db, [cafe_id for cafe_id, _ in nearby])
+    return {
+        "data": [
+            CafeNearbyResponse(
+                **CafeResponse.model_validate(cafe).model_dump(),
+                distance_m=round(distances[cafe.id], 1)
+            )
+            for cafe in cafes
+        ]
     }
 
 # Public endpoint - Get single cafe by ID
@@ -165,7 +262,12 @@ def create_cafe(
 
     db.add(new_cafe)
     db.commit()
+    invalidate_cafe_caches()
+    invalidate_text_index("cafe")
+    invalidate_vector_index("cafe")
     db.refresh(new_cafe)
+    facility_index.update_cafe(new_cafe.id, [f.slug for f in new_cafe.facilities])
+    geo_index.update_cafe(new_cafe.id, new_cafe.latitude, new_cafe.longitude)
     return {"data": new_cafe, "message": "Cafe created successfully"}
 
 
@@ -201,6 +303,8 @@ def bulk_import_cafes(
     ```
     """
     results: list[CafeBulkResultItem] = []
+    # (id, facility slugs, latitude, longitude) of the new cafes, read before the commit expires them
+    created_cafes: list[tuple] = []
     created_count = 0
     skipped_count = 0
     failed_count = 0
@@ -240,8 +344,8 @@ def bulk_import_cafes(
             new_cafe = Cafe(**cafe_data)
 
             # Map facility slugs to facilities
+            facilities = []
             if cafe_item.facility_slugs:
-                facilities = []
                 for slug in cafe_item.facility_slugs:
                     if slug in facility_map:
                         facilities.append(facility_map[slug])
@@ -258,6 +362,9 @@ def bulk_import_cafes(
                 success=True,
                 id=new_cafe.id
             ))
+            created_cafes.append((
+                new_cafe.id, [f.slug for f in facilities], new_cafe.latitude, new_cafe.longitude
+            ))
             created_count += 1
 
         except Exception as e:
@@ -270,6 +377,12 @@ def bulk_import_cafes(
 
     # Commit all successful inserts
     db.commit()
+    invalidate_cafe_caches()
+    invalidate_text_index("cafe")
+    invalidate_vector_index("cafe")
+    for cafe_id, slugs, latitude, longitude in created_cafes:
+        facility_index.update_cafe(cafe_id, slugs)
+        geo_index.update_cafe(cafe_id, latitude, longitude)
 
     return CafeBulkResponse(
         total=len(bulk_data.cafes),
@@ -317,7 +430,12 @@ def update_cafe(
         setattr(cafe, field, value)
 
     db.commit()
+    invalidate_cafe_caches()
+    invalidate_text_index("cafe")
+    invalidate_vector_index("cafe")
     db.refresh(cafe)
+    facility_index.update_cafe(cafe.id, [f.slug for f in cafe.facilities])
+    geo_index.update_cafe(cafe.id, cafe.latitude, cafe.longitude)
     return {"data": cafe, "message": "Cafe updated successfully"}
 
 @router.delete("/{cafe_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -339,4 +457,9 @@ def delete_cafe(
     
     db.delete(cafe)
     db.commit()
+    invalidate_cafe_caches()
+    invalidate_text_index("cafe")
+    invalidate_vector_index("cafe")
+    facility_index.remove_cafe(cafe_id)
+    geo_index.remove_cafe(cafe_id)
     return None
@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header
+from sqlalchemy.orm import Session
+from sqlalchemy import func, select
 from typing import Optional, Literal
 from math import ceil
-from database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_db, get_async_db
 from models import Collection, Cafe, Admin
 from schemas import (
     CollectionCreate,
@@ -15,32 +16,117 @@ from schemas import (
     CollectionCafesUpdate,
     CafeResponse,
     PaginatedResponse,
+    CursorPaginatedResponse,
     ApiResponse,
     MessageResponse
 )
-from auth_utils import get_current_admin, get_password_hash, verify_password
+from auth_utils import (
+    get_current_admin, get_password_hash, verify_password_async,
+    create_collection_access_token, verify_collection_access_token
+)
+from services.text_search import text_match, invalidate_text_index
+from services.vector_index import invalidate_vector_index
+from services.collection_listing import (
+    cafe_counts, set_collection_cafes, add_collection_cafes, remove_collection_cafes, collection_cafes_page
+)
+from config import settings
 
 router = APIRouter()
 
 
-def collection_to_response(collection: Collection, include_cafes: bool = False):
-    """Convert Collection model to response dict with cafe_count"""
-    response = {
+def collection_to_response(collection: Collection, cafe_count: int):
+    """
+    Convert Collection model to response dict with cafe_count.
+    cafe_count comes from cafe_counts, the cafes relationship is never loaded.
+    """
+    return {
         "id": collection.id,
         "name": collection.name,
         "slug": collection.slug,
         "description": collection.description,
         "gambar_cover": collection.gambar_cover,
         "visibility": collection.visibility,
-        "cafe_count": len(collection.cafes) if collection.cafes else 0,
+        "cafe_count": cafe_count,
         "created_at": collection.created_at,
         "updated_at": collection.updated_at,
     }
-    if include_cafes:
-        response["cafes"] = collection.cafes
+
+
+def collection_detail_response(db: Session, collection: Collection, show_cafes: bool = True):
+    """Collection with the first page of its cafes and the cursor of the next one"""
+    response = collection_to_response(collection, cafe_counts(db, [collection.id]).get(collection.id, 0))
+    response["cafes"] = []
+    response["next_cursor"] = None
+    if show_cafes:
+        response["cafes"], response["next_cursor"] = collection_cafes_page(
+            db, collection.id, page_size=settings.COLLECTION_DETAIL_CAFES
+        )
     return response
 
 
+def collection_cafes_response(
+    db: Session,
+    collection: Collection,
+    sort_by: str,
+    sort_order: str,
+    cursor: Optional[str],
+    page_size: int
+):
+    """One page of the cafes of a collection, as returned by the /cafes endpoints"""
+    try:
+        cafes, next_cursor = collection_cafes_page(db, collection.id, sort_by, sort_order, cursor, page_size)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    return {
+        "data": cafes,
+        "meta": {
+            "total": cafe_counts(db, [collection.id]).get(collection.id, 0),
+            "page_size": page_size,
+            "next_cursor": next_cursor
+        }
+    }
+
+
+def get_visible_collection(db: Session, collection_id: str) -> Collection:
+    """Collection by ID, 404 when missing and 403 when private"""
+    collection = db.query(Collection).filter(Collection.id == collection_id).first()
+
+    if collection is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Collection not found"
+        )
+
+    # Only allow public and password_protected collections
+    if collection.visibility not in ['public', 'password_protected']:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="This collection is private"
+        )
+    return collection
+
+
+def can_view_cafes(collection: Collection, access_token: Optional[str]) -> bool:
+    """Public collections show their cafes, password_protected ones need a token from /access"""
+    if collection.visibility == 'password_protected':
+        return verify_collection_access_token(access_token, collection.id, collection.password_hash)
+    return True
+
+
+def validate_cafe_ids(db: Session, cafe_ids: list):
+    """400 when any of the cafe IDs does not exist"""
+    found = db.query(func.count(Cafe.id)).filter(Cafe.id.in_(cafe_ids)).scalar()
+    if found != len(cafe_ids):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="One or more cafe IDs are invalid"
+        )
+
+
 # =====================
 # PUBLIC ENDPOINTS
 # =====================
@@ -49,35 +135,40 @@ def collection_to_response(collection: Collection, include_cafes: bool = False):
 def get_public_collections(
     page: int = Query(1, ge=1, description="Page number"),
     page_size: int = Query(10, ge=1, le=100, description="Items per page"),
-    search: Optional[str] = Query(None, description="Search by name"),
+    search: Optional[str] = Query(None, description="Search by name or description"),
     db: Session = Depends(get_db)
 ):
     """
     Get list of public collections (visibility = 'public' or 'password_protected')
     Public endpoint - no authentication required
     """
-    query = db.query(Collection).options(joinedload(Collection.cafes))
+    query = db.query(Collection)
 
     # Only show public and password_protected collections
     query = query.filter(Collection.visibility.in_(['public', 'password_protected']))
 
-    # Search filter
-    if search:
-        query = query.filter(Collection.name.ilike(f"%{search}%"))
+    # Search filter, most relevant first
+    match = text_match(db, "collection", search) if search else None
+    if match:
+        query = query.filter(match.condition)
 
     # Get total count
     total = query.count()
 
     # Order and paginate
-    query = query.order_by(Collection.created_at.desc())
+    if match and match.score is not None:
+        query = query.order_by(match.score.desc(), Collection.created_at.desc())
+    else:
+        query = query.order_by(Collection.created_at.desc())
     offset = (page - 1) * page_size
     collections = query.offset(offset).limit(page_size).all()
+    counts = cafe_counts(db, [c.id for c in collections])
 
     # Calculate total pages
     total_pages = ceil(total / page_size) if total > 0 else 0
 
     return {
-        "data": [collection_to_response(c) for c in collections],
+        "data": [collection_to_response(c, cafe_count=counts.get(c.id, 0)) for c in collections],
         "meta": {
             "total": total,
             "page": page,
@@ -88,15 +179,17 @@ def get_public_collections(
 
 
 @router.get("/slug/{slug}", response_model=ApiResponse[CollectionDetailResponse])
-def get_collection_by_slug(slug: str, db: Session = Depends(get_db)):
+def get_collection_by_slug(
+    slug: str,
+    x_collection_token: Optional[str] = Header(None, description="access_token from /access, for password_protected collections"),
+    db: Session = Depends(get_db)
+):
     """
     Get collection by slug (public collections only, shows cafes)
-    For password_protected, use /access endpoint
+    For password_protected, use /access endpoint then send its token as X-Collection-Token
     Public endpoint - no authentication required
     """
-    collection = db.query(Collection).options(
-        joinedload(Collection.cafes).joinedload(Cafe.facilities)
-    ).filter(Collection.slug == slug).first()
+    collection = db.query(Collection).filter(Collection.slug == slug).first()
 
     if collection is None:
         raise HTTPException(
@@ -111,61 +204,77 @@ def get_collection_by_slug(slug: str, db: Session = Depends(get_db)):
             detail="This collection is private"
         )
 
-    # For password_protected, don't show cafes
-    if collection.visibility == 'password_protected':
-        response = collection_to_response(collection, include_cafes=False)
-        response["cafes"] = []  # Hide cafes for password protected
+    # For password_protected without a valid token, don't show cafes
+    if not can_view_cafes(collection, x_collection_token):
+        response = collection_detail_response(db, collection, show_cafes=False)  # Hide cafes for password protected
         return {"data": response, "message": "Password required to view cafes"}
 
-    return {"data": collection_to_response(collection, include_cafes=True)}
+    return {"data": collection_detail_response(db, collection)}
 
 
 @router.get("/{collection_id}", response_model=ApiResponse[CollectionDetailResponse])
-def get_collection_by_id(collection_id: str, db: Session = Depends(get_db)):
+def get_collection_by_id(
+    collection_id: str,
+    x_collection_token: Optional[str] = Header(None, description="access_token from /access, for password_protected collections"),
+    db: Session = Depends(get_db)
+):
     """
     Get collection by ID (public collections only, shows cafes)
-    For password_protected, use /access endpoint
+    For password_protected, use /access endpoint then send its token as X-Collection-Token
     Public endpoint - no authentication required
     """
-    collection = db.query(Collection).options(
-        joinedload(Collection.cafes).joinedload(Cafe.facilities)
-    ).filter(Collection.id == collection_id).first()
+    collection = get_visible_collection(db, collection_id)
 
-    if collection is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Collection not found"
-        )
+    # For password_protected without a valid token, don't show cafes
+    if not can_view_cafes(collection, x_collection_token):
+        response = collection_detail_response(db, collection, show_cafes=False)
+        return {"data": response, "message": "Password required to view cafes"}
 
-    # Only allow public and password_protected collections
-    if collection.visibility not in ['public', 'password_protected']:
+    return {"data": collection_detail_response(db, collection)}
+
+
+@router.get("/{collection_id}/cafes", response_model=CursorPaginatedResponse[CafeResponse])
+def get_collection_cafes(
+    collection_id: str,
+    cursor: Optional[str] = Query(None, description="Resume after this cursor (from meta.next_cursor or the detail's next_cursor)"),
+    page_size: int = Query(20, ge=1, le=100, description="Number of cafes per page"),
+    sort_by: Literal["position", "rating", "nama", "reviews", "terbaru"] = Query("position", description="position is the curated order"),
+    sort_order: Literal["asc", "desc"] = Query("asc", description="Sort order"),
+    x_collection_token: Optional[str] = Header(None, description="access_token from /access, for password_protected collections"),
+    db: Session = Depends(get_db)
+):
+    """
+    Get the cafes of a public collection, one page at a time.
+    Pass `meta.next_cursor` back as `cursor` to get the next page.
+    password_protected collections need the X-Collection-Token from /access.
+    Public endpoint - no authentication required
+    """
+    collection = get_visible_collection(db, collection_id)
+
+    if not can_view_cafes(collection, x_collection_token):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
-            detail="This collection is private"
+            detail="Password required to view cafes"
         )
 
-    # For password_protected, don't show cafes
-    if collection.visibility == 'password_protected':
-        response = collection_to_response(collection, include_cafes=False)
-        response["cafes"] = []
-        return {"data": response, "message": "Password required to view cafes"}
-
-    return {"data": collection_to_response(collection, include_cafes=True)}
+    return collection_cafes_response(db, collection, sort_by, sort_order, cursor, page_size)
 
 
 @router.post("/{collection_id}/access", response_model=CollectionAccessResponse)
-def access_protected_collection(
+async def access_protected_collection(
     collection_id: str,
     access_request: CollectionAccessRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Verify password and get access to password-protected collection
+    Verify password and get access to password-protected collection.
+    Returns a short-lived access_token: send it as X-Collection-Token to the
+    detail and /cafes endpoints instead of entering the password again.
     Public endpoint - no authentication required
     """
-    collection = db.query(Collection).options(
-        joinedload(Collection.cafes).joinedload(Cafe.facilities)
-    ).filter(Collection.id == collection_id).first()
+    collection = (await db.execute(
+        select(Collection).where(Collection.id == collection_id)
+    )).scalar_one_or_none()
 
     if collection is None:
         raise HTTPException(
@@ -179,17 +288,20 @@ def access_protected_collection(
             detail="This collection is not password protected"
         )
 
-    # Verify password
-    if not collection.password_hash or not verify_password(access_request.password, collection.password_hash):
+    # Verify password (bcrypt runs on the bounded worker pool, not on the event loop)
+    if not collection.password_hash or not await verify_password_async(access_request.password, collection.password_hash):
         return CollectionAccessResponse(
             access_granted=False,
             collection=None,
             message="Invalid password"
         )
 
+    detail = await db.run_sync(lambda session: collection_detail_response(session, collection))
     return CollectionAccessResponse(
         access_granted=True,
-        collection=collection_to_response(collection, include_cafes=True),
+        collection=detail,
+        access_token=create_collection_access_token(collection.id, collection.password_hash),
+        expires_in=settings.COLLECTION_ACCESS_TOKEN_EXPIRE_MINUTES * 60,
         message="Access granted"
     )
 
@@ -202,7 +314,7 @@ def access_protected_collection(
 def get_all_collections_admin(
     page: int = Query(1, ge=1, description="Page number"),
     page_size: int = Query(10, ge=1, le=100, description="Items per page"),
-    search: Optional[str] = Query(None, description="Search by name"),
+    search: Optional[str] = Query(None, description="Search by name or description"),
     visibility: Optional[Literal['public', 'private', 'password_protected']] = Query(None, description="Filter by visibility"),
     db: Session = Depends(get_db),
     current_admin: Admin = Depends(get_current_admin)
@@ -211,29 +323,34 @@ def get_all_collections_admin(
     Get all collections including private ones
     Admin only - requires authentication
     """
-    query = db.query(Collection).options(joinedload(Collection.cafes))
+    query = db.query(Collection)
 
     # Filter by visibility
     if visibility:
         query = query.filter(Collection.visibility == visibility)
 
-    # Search filter
-    if search:
-        query = query.filter(Collection.name.ilike(f"%{search}%"))
+    # Search filter, most relevant first
+    match = text_match(db, "collection", search) if search else None
+    if match:
+        query = query.filter(match.condition)
 
     # Get total count
     total = query.count()
 
     # Order and paginate
-    query = query.order_by(Collection.created_at.desc())
+    if match and match.score is not None:
+        query = query.order_by(match.score.desc(), Collection.created_at.desc())
+    else:
+        query = query.order_by(Collection.created_at.desc())
     offset = (page - 1) * page_size
     collections = query.offset(offset).limit(page_size).all()
+    counts = cafe_counts(db, [c.id for c in collections])
 
     # Calculate total pages
     total_pages = ceil(total / page_size) if total > 0 else 0
 
     return {
-        "data": [collection_to_response(c) for c in collections],
+        "data": [collection_to_response(c, cafe_count=counts.get(c.id, 0)) for c in collections],
         "meta": {
             "total": total,
             "page": page,
@@ -253,9 +370,32 @@ def get_collection_admin(
     Get collection by ID (admin access - can see all including private)
     Admin only - requires authentication
     """
-    collection = db.query(Collection).options(
-        joinedload(Collection.cafes).joinedload(Cafe.facilities)
-    ).filter(Collection.id == collection_id).first()
+    collection = db.query(Collection).filter(Collection.id == collection_id).first()
+
+    if collection is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Collection not found"
+        )
+
+    return {"data": collection_detail_response(db, collection)}
+
+
+@router.get("/admin/{collection_id}/cafes", response_model=CursorPaginatedResponse[CafeResponse])
+def get_collection_cafes_admin(
+    collection_id: str,
+    cursor: Optional[str] = Query(None, description="Resume after this cursor (from meta.next_cursor or the detail's next_cursor)"),
+    page_size: int = Query(20, ge=1, le=100, description="Number of cafes per page"),
+    sort_by: Literal["position", "rating", "nama", "reviews", "terbaru"] = Query("position", description="position is the curated order"),
+    sort_order: Literal["asc", "desc"] = Query("asc", description="Sort order"),
+    db: Session = Depends(get_db),
+    current_admin: Admin = Depends(get_current_admin)
+):
+    """
+    Get the cafes of any collection (including private), one page at a time
+    Admin only - requires authentication
+    """
+    collection = db.query(Collection).filter(Collection.id == collection_id).first()
 
     if collection is None:
         raise HTTPException(
@@ -263,7 +403,7 @@ def get_collection_admin(
             detail="Collection not found"
         )
 
-    return {"data": collection_to_response(collection, include_cafes=True)}
+    return collection_cafes_response(db, collection, sort_by, sort_order, cursor, page_size)
 
 
 @router.post("/", response_model=ApiResponse[CollectionResponse], status_code=status.HTTP_201_CREATED)
@@ -293,22 +433,23 @@ def create_collection(
 
     # Create collection
     new_collection = Collection(**data)
+    db.add(new_collection)
+    db.flush()  # Get the ID for the memberships
 
-    # Add cafes if provided
+    # Add cafes if provided, in the given order
     if collection_data.cafe_ids:
-        cafes = db.query(Cafe).filter(Cafe.id.in_(collection_data.cafe_ids)).all()
-        if len(cafes) != len(collection_data.cafe_ids):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="One or more cafe IDs are invalid"
-            )
-        new_collection.cafes = cafes
+        validate_cafe_ids(db, collection_data.cafe_ids)
+        set_collection_cafes(db, new_collection.id, collection_data.cafe_ids)
 
-    db.add(new_collection)
     db.commit()
+    invalidate_text_index("collection")
+    invalidate_vector_index("collection")
     db.refresh(new_collection)
 
-    return {"data": collection_to_response(new_collection), "message": "Collection created successfully"}
+    return {
+        "data": collection_to_response(new_collection, cafe_counts(db, [new_collection.id]).get(new_collection.id, 0)),
+        "message": "Collection created successfully"
+    }
 
 
 @router.put("/{collection_id}", response_model=ApiResponse[CollectionResponse])
@@ -322,9 +463,7 @@ def update_collection(
     Update collection
     Admin only - requires authentication
     """
-    collection = db.query(Collection).options(
-        joinedload(Collection.cafes)
-    ).filter(Collection.id == collection_id).first()
+    collection = db.query(Collection).filter(Collection.id == collection_id).first()
 
     if collection is None:
         raise HTTPException(
@@ -352,17 +491,12 @@ def update_collection(
         if password:
             update_data['password_hash'] = get_password_hash(password)
 
-    # Handle cafe_ids update
+    # Handle cafe_ids update (replaces the cafes, in the given order)
     if 'cafe_ids' in update_data:
         cafe_ids = update_data.pop('cafe_ids')
         if cafe_ids is not None:
-            cafes = db.query(Cafe).filter(Cafe.id.in_(cafe_ids)).all()
-            if len(cafes) != len(cafe_ids):
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="One or more cafe IDs are invalid"
-                )
-            collection.cafes = cafes
+            validate_cafe_ids(db, cafe_ids)
+            set_collection_cafes(db, collection.id, cafe_ids)
 
     # Validate password requirement for password_protected
     new_visibility = update_data.get('visibility', collection.visibility)
@@ -377,9 +511,14 @@ def update_collection(
         setattr(collection, field, value)
 
     db.commit()
+    invalidate_text_index("collection")
+    invalidate_vector_index("collection")
     db.refresh(collection)
 
-    return {"data": collection_to_response(collection), "message": "Collection updated successfully"}
+    return {
+        "data": collection_to_response(collection, cafe_counts(db, [collection.id]).get(collection.id, 0)),
+        "message": "Collection updated successfully"
+    }
 
 
 @router.delete("/{collection_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -402,6 +541,8 @@ def delete_collection(
 
     db.delete(collection)
     db.commit()
+    invalidate_text_index("collection")
+    invalidate_vector_index("collection")
     return None
 
 
@@ -413,12 +554,10 @@ def add_cafes_to_collection(
     current_admin: Admin = Depends(get_current_admin)
 ):
     """
-    Add cafes to collection
+    Add cafes to the end of a collection (cafes already in it are skipped)
     Admin only - requires authentication
     """
-    collection = db.query(Collection).options(
-        joinedload(Collection.cafes).joinedload(Cafe.facilities)
-    ).filter(Collection.id == collection_id).first()
+    collection = db.query(Collection).filter(Collection.id == collection_id).first()
 
     if collection is None:
         raise HTTPException(
@@ -426,29 +565,14 @@ def add_cafes_to_collection(
             detail="Collection not found"
         )
 
-    # Get cafes to add
-    cafes_to_add = db.query(Cafe).filter(Cafe.id.in_(cafes_update.cafe_ids)).all()
-    if len(cafes_to_add) != len(cafes_update.cafe_ids):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="One or more cafe IDs are invalid"
-        )
-
-    # Get current cafe IDs
-    current_cafe_ids = {c.id for c in collection.cafes}
-
-    # Add only new cafes
-    added_count = 0
-    for cafe in cafes_to_add:
-        if cafe.id not in current_cafe_ids:
-            collection.cafes.append(cafe)
-            added_count += 1
+    validate_cafe_ids(db, cafes_update.cafe_ids)
+    added_count = add_collection_cafes(db, collection.id, cafes_update.cafe_ids)
 
     db.commit()
     db.refresh(collection)
 
     return {
-        "data": collection_to_response(collection, include_cafes=True),
+        "data": collection_detail_response(db, collection),
         "message": f"Added {added_count} cafe(s) to collection"
     }
 
@@ -464,9 +588,7 @@ def remove_cafes_from_collection(
     Remove cafes from collection
     Admin only - requires authentication
     """
-    collection = db.query(Collection).options(
-        joinedload(Collection.cafes).joinedload(Cafe.facilities)
-    ).filter(Collection.id == collection_id).first()
+    collection = db.query(Collection).filter(Collection.id == collection_id).first()
 
     if collection is None:
         raise HTTPException(
@@ -475,15 +597,12 @@ def remove_cafes_from_collection(
         )
 
     # Remove specified cafes
-    cafe_ids_to_remove = set(cafes_update.cafe_ids)
-    removed_count = 0
-    collection.cafes = [c for c in collection.cafes if c.id not in cafe_ids_to_remove]
-    removed_count = len(cafe_ids_to_remove)
+    remove_collection_cafes(db, collection.id, cafes_update.cafe_ids)
 
     db.commit()
     db.refresh(collection)
 
     return {
-        "data": collection_to_response(collection, include_cafes=True),
+        "data": collection_detail_response(db, collection),
         "message": f"Removed cafe(s) from collection"
     }
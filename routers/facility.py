@@ -6,6 +6,9 @@ from database import get_db
 from models import Facility, Admin
 from schemas import FacilityCreate, FacilityUpdate, FacilityResponse, PaginatedResponse, ApiResponse
 from auth_utils import get_current_admin
+from services.cafe_listing import invalidate_cafe_caches
+from services.facility_index import facility_index
+from services.text_search import text_match, invalidate_text_index
 
 router = APIRouter()
 
@@ -14,7 +17,7 @@ router = APIRouter()
 def get_all_facilities(
     page: int = Query(1, ge=1, description="Page number (starts from 1)"),
     page_size: int = Query(10, ge=1, le=100, description="Number of items per page"),
-    search: Optional[str] = Query(None, description="Search by facility name"),
+    search: Optional[str] = Query(None, description="Search by facility name or description"),
     db: Session = Depends(get_db)
 ):
     """
@@ -23,15 +26,19 @@ def get_all_facilities(
     """
     query = db.query(Facility)
 
-    # Apply search filter
-    if search:
-        query = query.filter(Facility.name.ilike(f"%{search}%"))
+    # Apply search filter, most relevant first
+    match = text_match(db, "facility", search) if search else None
+    if match:
+        query = query.filter(match.condition)
 
     # Get total count
     total = query.count()
 
     # Order and paginate
-    query = query.order_by(Facility.name)
+    if match and match.score is not None:
+        query = query.order_by(match.score.desc(), Facility.name)
+    else:
+        query = query.order_by(Facility.name)
     offset = (page - 1) * page_size
     facilities = query.offset(offset).limit(page_size).all()
 
@@ -87,6 +94,9 @@ def create_facility(
     new_facility = Facility(**facility.model_dump())
     db.add(new_facility)
     db.commit()
+    invalidate_cafe_caches()
+    invalidate_text_index("facility")
+    facility_index.invalidate()
     db.refresh(new_facility)
     return {"data": new_facility, "message": "Facility created successfully"}
 
@@ -128,6 +138,9 @@ def update_facility(
         setattr(facility, field, value)
 
     db.commit()
+    invalidate_cafe_caches()
+    invalidate_text_index("facility")
+    facility_index.invalidate()
     db.refresh(facility)
     return {"data": facility, "message": "Facility updated successfully"}
 
@@ -150,4 +163,7 @@ def delete_facility(
 
     db.delete(facility)
     db.commit()
+    invalidate_cafe_caches()
+    invalidate_text_index("facility")
+    facility_index.invalidate()
     return None
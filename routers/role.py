@@ -11,7 +11,7 @@ from schemas import (
     PaginatedResponse,
     ApiResponse
 )
-from auth_utils import get_superadmin
+from auth_utils import get_superadmin, invalidate_principal
 
 router = APIRouter()
 
@@ -170,6 +170,7 @@ async def update_role(
         role.description = role_update.description
 
     db.commit()
+    invalidate_principal()  # Cached admins hold a copy of their role
     db.refresh(role)
     return {"data": role, "message": "Role updated successfully"}
 
@@ -1,14 +1,17 @@
 from fastapi import APIRouter, Depends, Query, HTTPException, Request
-from sqlalchemy.orm import Session
+from fastapi.responses import StreamingResponse
 from typing import Optional, List, Any, Dict
 from pydantic import BaseModel, Field
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
-from database import get_db
+from models import Admin
+from auth_utils import get_current_admin
 from services.nl_search import nl_search_service, ParsedQuery
+from services.parse_cache import parse_cache
 from schemas import CafeResponse, FacilityResponse, CollectionResponse, PaginationMeta
 from config import settings
+import json
 
 router = APIRouter()
 limiter = Limiter(key_func=get_remote_address)
@@ -71,18 +74,69 @@ class NLSearchResponse(BaseModel):
     results: SearchResults = Field(..., description="Search results by entity type")
 
 
+class ParseBatchRequest(BaseModel):
+    """Request body for batch query parsing"""
+    queries: List[str] = Field(
+        ..., min_length=1, max_length=settings.PARSE_BATCH_MAX_QUERIES, description="Natural language queries"
+    )
+
+
 class ParseQueryResponse(BaseModel):
     """Response for parse-only endpoint"""
     query: str
     parsed: ParsedQuery
 
 
+def serialize_search_result(key: str, data: Dict[str, Any]):
+    """
+    Serialize one entity result of NLSearchService.execute_search_async.
+    Reads lazy relationships, so it runs inside the entity's session.
+    """
+    if key == "cafes":
+        return CafeSearchResult(
+            items=[CafeResponse.model_validate(c) for c in data["items"]],
+            total=data["total"],
+            page=data["page"],
+            page_size=data["page_size"],
+            total_pages=data["total_pages"]
+        )
+
+    if key == "facilities":
+        return FacilitySearchResult(
+            items=[FacilityResponse.model_validate(f) for f in data["items"]],
+            total=data["total"],
+            page=data["page"],
+            page_size=data["page_size"],
+            total_pages=data["total_pages"]
+        )
+
+    return CollectionSearchResult(
+        items=[
+            CollectionResponse(
+                id=c.id,
+                name=c.name,
+                slug=c.slug,
+                description=c.description,
+                gambar_cover=c.gambar_cover,
+                visibility=c.visibility,
+                cafe_count=data["cafe_counts"].get(c.id, 0),
+                created_at=c.created_at,
+                updated_at=c.updated_at
+            )
+            for c in data["items"]
+        ],
+        total=data["total"],
+        page=data["page"],
+        page_size=data["page_size"],
+        total_pages=data["total_pages"]
+    )
+
+
 @router.post("/")
 @limiter.limit("30/minute")
-def natural_language_search(
+async def natural_language_search(
     request: Request,
-    body: NLSearchRequest,
-    db: Session = Depends(get_db)
+    body: NLSearchRequest
 ):
     """
     Search across all entities using natural language.
@@ -106,15 +160,11 @@ def natural_language_search(
             detail="Natural language search is not configured. Please set GROQ_API_KEYS."
         )
 
-    result = nl_search_service.search_all(
-        db=db,
-        query_text=body.query,
-        page=body.page,
-        page_size=body.page_size
-    )
+    # Parse first (async LLM call), the database is only touched afterwards
+    parsed = await nl_search_service.parse_query_async(body.query)
 
     # Check query type and respond accordingly
-    query_type = result["parsed_query"].get("query_type", "search")
+    query_type = parsed.query_type
 
     if query_type == "identity":
         return {
@@ -134,74 +184,32 @@ def natural_language_search(
             "message": "Halo juga! 👋 Mau cari cafe apa nih? Kasih tau aja, misal: 'cafe wifi murah di Jakarta'",
             "type": "greeting"
         }
-    elif not result["parsed_query"].get("is_relevant", True):
+    elif not parsed.is_relevant:
         return {
             "query": body.query,
             "message": "Apasih anjing gaje 😂 Ke gw bahas cafe aja ya!",
             "type": "irrelevant"
         }
 
-    # Transform results to response format
-    search_results = SearchResults()
-
-    if "cafes" in result["results"]:
-        cafe_data = result["results"]["cafes"]
-        search_results.cafes = CafeSearchResult(
-            items=[CafeResponse.model_validate(c) for c in cafe_data["items"]],
-            total=cafe_data["total"],
-            page=cafe_data["page"],
-            page_size=cafe_data["page_size"],
-            total_pages=cafe_data["total_pages"]
-        )
-
-    if "facilities" in result["results"]:
-        facility_data = result["results"]["facilities"]
-        search_results.facilities = FacilitySearchResult(
-            items=[FacilityResponse.model_validate(f) for f in facility_data["items"]],
-            total=facility_data["total"],
-            page=facility_data["page"],
-            page_size=facility_data["page_size"],
-            total_pages=facility_data["total_pages"]
-        )
-
-    if "collections" in result["results"]:
-        collection_data = result["results"]["collections"]
-        search_results.collections = CollectionSearchResult(
-            items=[
-                CollectionResponse(
-                    id=c.id,
-                    name=c.name,
-                    slug=c.slug,
-                    description=c.description,
-                    gambar_cover=c.gambar_cover,
-                    visibility=c.visibility,
-                    cafe_count=len(c.cafes),
-                    created_at=c.created_at,
-                    updated_at=c.updated_at
-                )
-                for c in collection_data["items"]
-            ],
-            total=collection_data["total"],
-            page=collection_data["page"],
-            page_size=collection_data["page_size"],
-            total_pages=collection_data["total_pages"]
-        )
+    # Entity searches run concurrently, latency is that of the slowest one
+    result = await nl_search_service.execute_search_async(
+        parsed, body.page, body.page_size, serialize=serialize_search_result
+    )
 
     return NLSearchResponse(
         query=body.query,
         parsed_query=result["parsed_query"],
-        results=search_results
+        results=SearchResults(**result["results"])
     )
 
 
 @router.get("/cafes")
 @limiter.limit("30/minute")
-def search_cafes_nl(
+async def search_cafes_nl(
     request: Request,
     q: str = Query(..., min_length=2, max_length=500, description="Natural language search query"),
     page: int = Query(default=1, ge=1),
-    page_size: int = Query(default=20, ge=1, le=100),
-    db: Session = Depends(get_db)
+    page_size: int = Query(default=20, ge=1, le=100)
 ):
     """
     Search cafes only using natural language.
@@ -217,7 +225,7 @@ def search_cafes_nl(
             detail="Natural language search is not configured. Please set GROQ_API_KEYS."
         )
 
-    parsed = nl_search_service.parse_query(q)
+    parsed = await nl_search_service.parse_query_async(q)
 
     # Check query type and respond accordingly
     if parsed.query_type == "identity":
@@ -245,24 +253,27 @@ def search_cafes_nl(
             "type": "irrelevant"
         }
 
-    result = nl_search_service.search_cafes(db, parsed, page, page_size)
+    result = await nl_search_service.execute_search_async(
+        parsed, page, page_size, serialize=serialize_search_result, entities=["cafes"]
+    )
+    cafes = result["results"]["cafes"]
 
     return {
         "query": q,
         "parsed_query": result["parsed_query"],
-        "data": [CafeResponse.model_validate(c) for c in result["items"]],
+        "data": cafes.items,
         "meta": PaginationMeta(
-            total=result["total"],
-            page=result["page"],
-            page_size=result["page_size"],
-            total_pages=result["total_pages"]
+            total=cafes.total,
+            page=cafes.page,
+            page_size=cafes.page_size,
+            total_pages=cafes.total_pages
         )
     }
 
 
 @router.post("/parse")
 @limiter.limit("30/minute")
-def parse_query_only(
+async def parse_query_only(
     request: Request,
     body: NLSearchRequest,
 ):
@@ -276,7 +287,7 @@ def parse_query_only(
             detail="Natural language search is not configured. Please set GROQ_API_KEYS."
         )
 
-    parsed = nl_search_service.parse_query(body.query)
+    parsed = await nl_search_service.parse_query_async(body.query)
 
     return ParseQueryResponse(
         query=body.query,
@@ -284,6 +295,60 @@ def parse_query_only(
     )
 
 
+@router.post("/parse/batch")
+async def parse_query_batch(
+    body: ParseBatchRequest,
+    current_admin: Admin = Depends(get_current_admin)
+):
+    """
+    Parse many queries at once, e.g. to warm the parse cache from a search log
+    or to compare parser changes. Admin only - requires authentication
+
+    Streams NDJSON, one line per distinct query in completion order:
+    {"query": ..., "count": <occurrences>, "cached": <bool>, "parsed": {...}} (or "error")
+    followed by a final {"summary": {...}} line.
+    """
+    if not settings.GROQ_API_KEYS:
+        raise HTTPException(
+            status_code=503,
+            detail="Natural language search is not configured. Please set GROQ_API_KEYS."
+        )
+
+    async def lines():
+        summary = {"queries": len(body.queries), "unique": 0, "cached": 0, "parsed": 0, "failed": 0}
+        async for item in nl_search_service.parse_batch(body.queries, settings.PARSE_BATCH_CONCURRENCY):
+            summary["unique"] += 1
+            if "error" in item:
+                summary["failed"] += 1
+            elif item["cached"]:
+                summary["cached"] += 1
+            else:
+                summary["parsed"] += 1
+            yield json.dumps(item, default=str) + "\n"
+        yield json.dumps({"summary": summary}) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@router.get("/cache/stats")
+def get_parse_cache_stats(current_admin: Admin = Depends(get_current_admin)):
+    """
+    Hit/miss statistics of the parsed query cache and of request coalescing
+    Admin only - requires authentication
+    """
+    return {"data": {**parse_cache.stats(), "single_flight": nl_search_service.flights.stats()}}
+
+
+@router.get("/groq/stats")
+def get_groq_stats(current_admin: Admin = Depends(get_current_admin)):
+    """
+    Circuit breaker state and latency of each Groq key
+    Admin only - requires authentication
+    """
+    balancer = nl_search_service.load_balancer
+    return {"data": balancer.stats() if balancer else []}
+
+
 @router.get("/suggestions")
 def get_search_suggestions():
     """
@@ -8,16 +8,28 @@ import re
 T = TypeVar('T')
 
 class PaginationMeta(BaseModel):
-    total: int = Field(..., description="Total number of items")
+    total: Optional[int] = Field(..., description="Total number of items (null when the count was skipped)")
     page: int = Field(..., description="Current page number")
     page_size: int = Field(..., description="Number of items per page")
-    total_pages: int = Field(..., description="Total number of pages")
+    total_pages: Optional[int] = Field(..., description="Total number of pages (null when the count was skipped)")
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page (keyset pagination), null on the last page")
+    total_estimated: bool = Field(False, description="True when total is an estimate instead of an exact count")
 
 class PaginatedResponse(BaseModel, Generic[T]):
     """Response wrapper for paginated list endpoints"""
     data: List[T] = Field(..., description="List of items")
     meta: PaginationMeta = Field(..., description="Pagination metadata")
 
+class CursorPaginationMeta(BaseModel):
+    total: int = Field(..., description="Total number of items")
+    page_size: int = Field(..., description="Number of items per page")
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page, null on the last page")
+
+class CursorPaginatedResponse(BaseModel, Generic[T]):
+    """Response wrapper for cursor-only list endpoints"""
+    data: List[T] = Field(..., description="List of items")
+    meta: CursorPaginationMeta = Field(..., description="Pagination metadata")
+
 class ApiResponse(BaseModel, Generic[T]):
     """Response wrapper for single item endpoints (GET by ID, POST, PUT)"""
     data: T = Field(..., description="Response data")
@@ -81,6 +93,8 @@ class CafeBase(BaseModel):
     count_google_review: Optional[int] = Field(None, ge=0, description="Jumlah review Google")
     jam_buka: Optional[str] = Field(None, description="Jam buka")
     alamat_lengkap: Optional[str] = Field(None, description="Alamat lengkap")
+    latitude: Optional[float] = Field(None, ge=-90, le=90, description="Latitude (Google Maps)")
+    longitude: Optional[float] = Field(None, ge=-180, le=180, description="Longitude (Google Maps)")
 
 class CafeCreate(CafeBase):
     facility_ids: Optional[List[str]] = Field(None, description="List of facility IDs")
@@ -120,10 +134,16 @@ class CafeUpdate(BaseModel):
     count_google_review: Optional[int] = Field(None, ge=0)
     jam_buka: Optional[str] = None
     alamat_lengkap: Optional[str] = None
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
     facility_ids: Optional[List[str]] = Field(None, description="List of facility IDs to replace current facilities")
 
 class CafeResponse(CafeBase):
     id: str
+    price_min: Optional[int] = Field(None, description="Harga termurah dari range_price (Rupiah)")
+    price_max: Optional[int] = Field(None, description="Harga termahal dari range_price (Rupiah)")
+    city: Optional[str] = Field(None, description="Kota dari alamat_lengkap")
+    district: Optional[str] = Field(None, description="Daerah dari alamat_lengkap (mis. Kemang)")
     facilities: List[FacilityResponse] = Field(default_factory=list, description="List of facilities")
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
@@ -131,6 +151,23 @@ class CafeResponse(CafeBase):
     class Config:
         from_attributes = True
 
+class CafeNearbyResponse(CafeResponse):
+    distance_m: float = Field(..., description="Distance from the requested point in meters")
+
+# Cafe Facet Schemas
+class FacetBucket(BaseModel):
+    """Single facet value with the number of matching cafes"""
+    key: str = Field(..., description="Value to filter by (facility slug, rating bucket or price category)")
+    label: str = Field(..., description="Display label")
+    count: int = Field(..., description="Number of cafes matching the current filters")
+
+class CafeFacetsResponse(BaseModel):
+    """Facet counts for the cafe filter panel"""
+    total: int = Field(..., description="Number of cafes matching the current filters")
+    facilities: List[FacetBucket] = Field(default_factory=list, description="Counts per facility")
+    rating: List[FacetBucket] = Field(default_factory=list, description="Counts per rating bucket")
+    price: List[FacetBucket] = Field(default_factory=list, description="Counts per price category")
+
 # Role Schemas
 class RoleBase(BaseModel):
     name: str = Field(..., min_length=2, max_length=50, description="Role name")
@@ -283,7 +320,8 @@ class CollectionDetailResponse(BaseModel):
     gambar_cover: Optional[str] = None
     visibility: str
     cafe_count: int = 0
-    cafes: List[CafeResponse] = Field(default_factory=list, description="List of cafes in collection")
+    cafes: List[CafeResponse] = Field(default_factory=list, description="First page of the cafes in collection (curated order)")
+    next_cursor: Optional[str] = Field(None, description="Cursor of the next page of cafes (GET /{id}/cafes?cursor=), null when all are shown")
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
 
@@ -296,6 +334,8 @@ class CollectionAccessRequest(BaseModel):
 class CollectionAccessResponse(BaseModel):
     access_granted: bool
     collection: Optional[CollectionDetailResponse] = None
+    access_token: Optional[str] = Field(None, description="Send as X-Collection-Token header instead of the password")
+    expires_in: Optional[int] = Field(None, description="Token lifetime in seconds")
     message: str
 
 class CollectionCafesUpdate(BaseModel):
@@ -4,6 +4,7 @@ Collection seeder - Creates sample collection data for development/testing
 from sqlalchemy.orm import Session
 from models import Collection, Cafe
 from auth_utils import get_password_hash
+from services.collection_listing import set_collection_cafes
 from .base_seeder import BaseSeeder
 
 
@@ -286,13 +287,13 @@ class CollectionSeeder(BaseSeeder):
                 password_hash=password_hash
             )
 
-            # Add filtered cafes
-            cafes = self._filter_cafes(cafe_filters)
-            collection.cafes = cafes
-
             self.db.add(collection)
             self.db.flush()
 
+            # Add filtered cafes, positions following the filter order
+            cafes = self._filter_cafes(cafe_filters)
+            set_collection_cafes(self.db, collection.id, [cafe.id for cafe in cafes])
+
             visibility_label = collection_data["visibility"]
             if visibility_label == "password_protected":
                 visibility_label = f"password_protected (pwd: {password})"
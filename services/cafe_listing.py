@@ -0,0 +1,410 @@
+from typing import Tuple, Any, Optional, List, Dict
+from pydantic import BaseModel, field_validator
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import or_, and_, cast, bindparam, String, func, select
+from config import settings
+from models import Cafe, Facility, CafeOpeningHour
+from services.cache import TTLCache
+from services.facility_index import facility_index
+from services.price_range import PRICE_CATEGORIES, PRICE_CATEGORY_LABELS, price_category
+from services.text_search import text_match, TextMatch
+from services.gazetteer import resolve_place, find_places, cities_in
+import base64
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Valid sort fields
+SORT_FIELDS = {
+    "rating": Cafe.rating,
+    "nama": Cafe.nama,
+    "reviews": Cafe.count_google_review,
+    "terbaru": Cafe.created_at
+}
+
+
+# Sort fields compared as the text stored by the database.
+# Timestamps written by server_default and by the ORM use different text formats on SQLite,
+# so a round trip through datetime would not compare equal to the stored value.
+RAW_CURSOR_FIELDS = {"terbaru"}
+
+
+def _cursor_value(db: Session, cafe: Cafe, sort_by: str) -> Any:
+    """Read the sort value of a cafe in a JSON friendly form"""
+    sort_column = SORT_FIELDS[sort_by]
+    if sort_by in RAW_CURSOR_FIELDS:
+        return db.query(cast(sort_column, String)).filter(Cafe.id == cafe.id).scalar()
+    return getattr(cafe, sort_column.key)
+
+
+def encode_cursor(db: Session, cafe: Cafe, sort_by: str) -> str:
+    """
+    Encode the position of the last cafe on a page.
+    The cursor holds the (nulls-flag, sort value, nama, id) tuple used by ORDER BY.
+    """
+    value = _cursor_value(db, cafe, sort_by)
+    payload = [1 if value is None else 0, value, cafe.nama, cafe.id]
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_by: str) -> Tuple[int, Any, str, str]:
+    """Decode a cursor created by encode_cursor, raises ValueError if malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        nulls_flag, value, nama, cafe_id = json.loads(base64.urlsafe_b64decode(padded))
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+    if nulls_flag not in (0, 1) or not isinstance(nama, str) or not isinstance(cafe_id, str):
+        raise ValueError("Invalid cursor")
+    if nulls_flag == 0 and value is None:
+        raise ValueError("Invalid cursor")
+    if isinstance(value, (list, dict)):
+        raise ValueError("Invalid cursor")
+
+    return nulls_flag, value, nama, cafe_id
+
+
+def apply_cursor(query, cursor: str, sort_by: str, sort_order: str):
+    """
+    Resume a listing after the cursor position with a range predicate.
+    Mirrors the ORDER BY used by the listing: NULLS LAST, sort column, nama, id.
+    """
+    nulls_flag, value, nama, cafe_id = decode_cursor(cursor, sort_by)
+    sort_column = SORT_FIELDS[sort_by]
+
+    # Tie breaker on (nama, id), always ascending
+    after_tie = or_(
+        Cafe.nama > nama,
+        and_(Cafe.nama == nama, Cafe.id > cafe_id)
+    )
+
+    if nulls_flag == 1:
+        # Already inside the NULL block at the end of the listing
+        return query.filter(and_(sort_column.is_(None), after_tie))
+
+    if sort_by in RAW_CURSOR_FIELDS:
+        value = bindparam(None, str(value), type_=String)
+
+    past_value = sort_column < value if sort_order == "desc" else sort_column > value
+    return query.filter(
+        or_(
+            sort_column.is_(None),
+            past_value,
+            and_(sort_column == value, after_tie)
+        )
+    )
+
+
+class CafeListFilters(BaseModel):
+    """Filters accepted by the cafe listing endpoints"""
+    search: Optional[str] = None
+    nama: Optional[str] = None
+    alamat: Optional[str] = None
+    city: Optional[str] = None  # City or district, synonyms allowed ("jaksel", "Kemang")
+    min_rating: Optional[float] = None
+    max_rating: Optional[float] = None
+    min_reviews: Optional[int] = None
+    min_price: Optional[int] = None
+    max_price: Optional[int] = None
+    open_minute: Optional[int] = None  # Minutes since Monday 00:00 the cafe must be open at
+    facility_slugs: List[str] = []
+
+    @field_validator('search', 'nama', 'alamat', 'city')
+    @classmethod
+    def collapse_whitespace(cls, v: Optional[str]) -> Optional[str]:
+        if v is None:
+            return None
+        return " ".join(v.split()) or None
+
+    @classmethod
+    def from_params(cls, facility_slugs: Optional[str] = None, **params) -> "CafeListFilters":
+        """Build filters from query params, facility_slugs is a comma-separated string"""
+        slugs = [s.strip() for s in facility_slugs.split(",") if s.strip()] if facility_slugs else []
+        return cls(facility_slugs=slugs, **params)
+
+    def cache_key(self) -> str:
+        """Normalized representation, equal for filters that select the same rows"""
+        data = self.model_dump()
+        for field in ("search", "nama", "alamat", "city"):
+            # Text filters use ILIKE or resolve case-insensitively, so case does not change the result
+            if data[field]:
+                data[field] = data[field].lower()
+        data["facility_slugs"] = sorted(set(data["facility_slugs"]))
+        return json.dumps(data, sort_keys=True, separators=(",", ":"))
+
+
+def search_match(db: Session, filters: CafeListFilters) -> Optional[TextMatch]:
+    """
+    Text match of the search filter, None without one.
+    Listings never sort by relevance, so the match is built without a score.
+    """
+    if not filters.search:
+        return None
+    return text_match(db, "cafe", filters.search, scored=False)
+
+
+def build_filter_query(db: Session, filters: CafeListFilters, match: Optional[TextMatch] = None):
+    """
+    Base query of cafes matching the filters, without eager loading or ordering.
+    match is the search_match already built for this request, if any.
+    """
+    query = db.query(Cafe)
+
+    # Search filter (searches in nama AND alamat through the text search backend)
+    if filters.search:
+        if match is None:
+            match = search_match(db, filters)
+        query = query.filter(match.condition)
+
+    # Individual filters
+    if filters.nama:
+        query = query.filter(Cafe.nama.ilike(f"%{filters.nama}%"))
+
+    if filters.alamat:
+        query = query.filter(Cafe.alamat_lengkap.ilike(f"%{filters.alamat}%"))
+
+    if filters.city:
+        query = query.filter(location_condition(filters.city))
+
+    if filters.min_rating is not None:
+        query = query.filter(Cafe.rating >= filters.min_rating)
+
+    if filters.max_rating is not None:
+        query = query.filter(Cafe.rating <= filters.max_rating)
+
+    if filters.min_reviews is not None:
+        query = query.filter(Cafe.count_google_review >= filters.min_reviews)
+
+    # Price filters match cafes whose price range overlaps [min_price, max_price].
+    # A missing bound means the range is open on that side ("< Rp 30.000", "Rp 100 rb+").
+    if filters.min_price is not None:
+        query = query.filter(
+            or_(
+                Cafe.price_max >= filters.min_price,
+                and_(Cafe.price_max.is_(None), Cafe.price_min.isnot(None))
+            )
+        )
+
+    if filters.max_price is not None:
+        query = query.filter(
+            or_(
+                Cafe.price_min <= filters.max_price,
+                and_(Cafe.price_min.is_(None), Cafe.price_max.isnot(None))
+            )
+        )
+
+    if filters.open_minute is not None:
+        query = query.filter(open_at_condition(filters.open_minute))
+
+    # Facility filter (bitwise AND in the facility bitmap index)
+    if filters.facility_slugs:
+        query = query.filter(Cafe.id.in_(facility_index.cafe_ids_with_all(db, filters.facility_slugs)))
+
+    return query
+
+
+def load_cafes_by_ids(db: Session, cafe_ids: List[str]) -> List[Cafe]:
+    """
+    Hydrate cafes with their facilities, keeping the order of cafe_ids.
+    Facilities come from a single IN query instead of a joined cartesian product.
+    """
+    if not cafe_ids:
+        return []
+    cafes = db.query(Cafe).options(selectinload(Cafe.facilities)).filter(Cafe.id.in_(cafe_ids)).all()
+    by_id = {cafe.id: cafe for cafe in cafes}
+    return [by_id[cafe_id] for cafe_id in cafe_ids if cafe_id in by_id]
+
+
+def location_condition(location: str):
+    """
+    Cafes in a place, by equality on the indexed city/district columns:
+    "jaksel" -> city = 'Jakarta Selatan', "kemang" -> district = 'Kemang',
+    "jakarta" -> any of the Jakarta cities. Unknown places fall back to an address substring match.
+    """
+    place = resolve_place(location)
+    if place is None:
+        # "Kemang, Jakarta" or "daerah jaksel": the most specific place mentioned
+        places = sorted(find_places(location.casefold()), key=lambda found: found[2].kind != "district")
+        place = places[0][2] if places else None
+    if place is None:
+        return Cafe.alamat_lengkap.ilike(f"%{location}%")
+    if place.kind == "district":
+        return Cafe.district == place.name
+    cities = cities_in(place.name)
+    return Cafe.city == place.name if len(cities) == 1 else Cafe.city.in_(cities)
+
+
+def open_at_condition(open_minute: int):
+    """Cafes open at a week minute, an indexed range lookup on cafe_opening_hours"""
+    open_cafe_ids = select(CafeOpeningHour.cafe_id).where(
+        CafeOpeningHour.start_minute <= open_minute,
+        CafeOpeningHour.end_minute > open_minute
+    )
+    return Cafe.id.in_(open_cafe_ids)
+
+
+def price_category_condition(category: str):
+    """
+    Range predicate on price_min/price_max for a price category ("murah", "sedang", "mahal").
+    Matches services.price_range.price_category: the cheapest price decides the category.
+    """
+    low, high = PRICE_CATEGORIES[category]
+
+    by_min = [Cafe.price_min.isnot(None)]
+    by_max = [Cafe.price_min.is_(None), Cafe.price_max.isnot(None)]
+    if low is not None:
+        by_min.append(Cafe.price_min >= low)
+        by_max.append(Cafe.price_max > low)
+    if high is not None:
+        by_min.append(Cafe.price_min < high)
+        by_max.append(Cafe.price_max <= high)
+
+    return or_(and_(*by_min), and_(*by_max))
+
+
+# Total counts per normalized filter set, cleared on cafe/facility writes
+count_cache = TTLCache(
+    maxsize=settings.LISTING_COUNT_CACHE_SIZE,
+    ttl=settings.LISTING_COUNT_CACHE_TTL_SECONDS
+)
+
+
+def _estimate_count(db: Session, query) -> Optional[int]:
+    """Row estimate from the MySQL optimizer, None if the dialect has no cheap estimate"""
+    if db.bind.dialect.name != "mysql":
+        return None
+
+    # Expanding IN lists (facility filter) only get their placeholders at execution time:
+    # render them now, and pass the parameters in placeholder order for the driver's paramstyle
+    compiled = query.with_entities(Cafe.id).statement.compile(
+        dialect=db.bind.dialect, compile_kwargs={"render_postcompile": True}
+    )
+    if compiled.positional:
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+    else:
+        params = compiled.params
+    try:
+        result = db.connection().exec_driver_sql(f"EXPLAIN {compiled}", params)
+        for row in result.mappings():
+            if row.get("table") == Cafe.__tablename__:
+                filtered = row.get("filtered") or 100
+                return int(round((row.get("rows") or 0) * float(filtered) / 100))
+    except Exception:
+        logger.warning("Count estimate failed, falling back to exact count", exc_info=True)
+    return None
+
+
+def count_cafes(
+    db: Session,
+    filters: CafeListFilters,
+    estimate: bool = False,
+    match: Optional[TextMatch] = None
+) -> Tuple[int, bool]:
+    """
+    Count cafes matching the filters, served from count_cache when possible.
+    match is passed on to build_filter_query. Returns (total, is_estimate).
+    """
+    key = filters.cache_key()
+
+    cached = count_cache.get(("exact", key))
+    if cached is not None:
+        return cached, False
+
+    query = build_filter_query(db, filters, match)
+
+    if estimate:
+        cached = count_cache.get(("estimate", key))
+        if cached is not None:
+            return cached, True
+        approx = _estimate_count(db, query)
+        if approx is not None:
+            count_cache.set(("estimate", key), approx)
+            return approx, True
+
+    # Filters never join, so rows are already unique per cafe
+    total = query.with_entities(func.count(Cafe.id)).scalar() or 0
+    count_cache.set(("exact", key), total)
+    return total, False
+
+
+# Rating buckets for facets: (key, label, low, high), low inclusive, high exclusive
+RATING_BUCKETS = [
+    ("4.5", "4.5+", 4.5, None),
+    ("4.0", "4.0 - 4.5", 4.0, 4.5),
+    ("3.5", "3.5 - 4.0", 3.5, 4.0),
+    ("0", "< 3.5", None, 3.5),
+]
+
+# Facet counts per normalized filter set, cleared on cafe/facility writes
+facets_cache = TTLCache(
+    maxsize=settings.LISTING_COUNT_CACHE_SIZE,
+    ttl=settings.LISTING_COUNT_CACHE_TTL_SECONDS
+)
+
+
+def _rating_bucket(rating: Optional[float]) -> str:
+    if rating is None:
+        return "none"
+    for key, _, low, high in RATING_BUCKETS:
+        if (low is None or rating >= low) and (high is None or rating < high):
+            return key
+    return "none"
+
+
+def compute_facets(db: Session, filters: CafeListFilters) -> Dict[str, Any]:
+    """
+    Count cafes per facility, rating bucket and price category in one pass over the filtered set.
+    Facility counts are popcounts in the facility bitmap index.
+    """
+    key = filters.cache_key()
+    cached = facets_cache.get(key)
+    if cached is not None:
+        return cached
+
+    rows = build_filter_query(db, filters).with_entities(
+        Cafe.id, Cafe.rating, Cafe.price_min, Cafe.price_max
+    ).all()
+
+    rating_counts = {bucket[0]: 0 for bucket in RATING_BUCKETS}
+    rating_counts["none"] = 0
+    price_counts = {category: 0 for category in PRICE_CATEGORIES}
+    price_counts["unknown"] = 0
+    for row in rows:
+        rating_counts[_rating_bucket(row.rating)] += 1
+        category = price_category(row.price_min, row.price_max)
+        price_counts[category or "unknown"] += 1
+
+    within = facility_index.bits_for_cafes(db, (row.id for row in rows))
+    facility_counts = facility_index.counts(db, within=within)
+    facility_names = dict(db.query(Facility.slug, Facility.name).all())
+
+    facets = {
+        "total": len(rows),
+        "facilities": sorted(
+            (
+                {"key": slug, "label": facility_names.get(slug, slug), "count": count}
+                for slug, count in facility_counts.items()
+            ),
+            key=lambda bucket: (-bucket["count"], bucket["label"])
+        ),
+        "rating": [
+            {"key": key, "label": label, "count": rating_counts[key]}
+            for key, label, _, _ in RATING_BUCKETS
+        ] + [{"key": "none", "label": "Belum ada rating", "count": rating_counts["none"]}],
+        "price": [
+            {"key": category, "label": PRICE_CATEGORY_LABELS[category], "count": price_counts[category]}
+            for category in PRICE_CATEGORIES
+        ] + [{"key": "unknown", "label": "Tidak diketahui", "count": price_counts["unknown"]}],
+    }
+    facets_cache.set(key, facets)
+    return facets
+
+
+def invalidate_cafe_caches() -> None:
+    """Drop cached listing data after cafe or facility writes"""
+    count_cache.clear()
+    facets_cache.clear()
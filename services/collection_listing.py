@@ -0,0 +1,146 @@
+from typing import Optional, List, Dict, Tuple
+from sqlalchemy.orm import Session
+from sqlalchemy import func, or_, and_, asc, desc, case
+from models import Cafe, collection_cafes
+from services.cafe_listing import SORT_FIELDS, encode_cursor, apply_cursor, load_cafes_by_ids
+import base64
+import json
+
+
+# Sorts of the cafes inside a collection: the curated position or any cafe listing sort
+COLLECTION_SORT_FIELDS = ["position", *SORT_FIELDS]
+
+
+def cafe_counts(db: Session, collection_ids: List[str]) -> Dict[str, int]:
+    """
+    Number of cafes per collection from one grouped COUNT over collection_cafes
+    (served by its primary key), instead of loading every cafe to len() it.
+    Collections without cafes are missing from the result.
+    """
+    if not collection_ids:
+        return {}
+    rows = db.query(
+        collection_cafes.c.collection_id, func.count()
+    ).filter(
+        collection_cafes.c.collection_id.in_(collection_ids)
+    ).group_by(collection_cafes.c.collection_id).all()
+    return {collection_id: count for collection_id, count in rows}
+
+
+# ---------------------
+# Membership writes
+# ---------------------
+# Explicit inserts instead of collection.cafes assignment: the ORM would neither
+# write the position nor avoid loading every member first.
+
+def set_collection_cafes(db: Session, collection_id: str, cafe_ids: List[str]) -> None:
+    """Replace the cafes of a collection, positions following the order of cafe_ids"""
+    db.execute(collection_cafes.delete().where(collection_cafes.c.collection_id == collection_id))
+    rows = [
+        {"collection_id": collection_id, "cafe_id": cafe_id, "position": position}
+        for position, cafe_id in enumerate(dict.fromkeys(cafe_ids))
+    ]
+    if rows:
+        db.execute(collection_cafes.insert(), rows)
+
+
+def add_collection_cafes(db: Session, collection_id: str, cafe_ids: List[str]) -> int:
+    """Append cafes after the current last position, skipping members; returns how many were added"""
+    members = collection_cafes.c.collection_id == collection_id
+    existing = {
+        row.cafe_id for row in db.query(collection_cafes.c.cafe_id).filter(
+            members, collection_cafes.c.cafe_id.in_(cafe_ids)
+        ).all()
+    }
+    new_ids = [cafe_id for cafe_id in dict.fromkeys(cafe_ids) if cafe_id not in existing]
+    if not new_ids:
+        return 0
+
+    last = db.query(func.max(collection_cafes.c.position)).filter(members).scalar()
+    start = 0 if last is None else last + 1
+    db.execute(collection_cafes.insert(), [
+        {"collection_id": collection_id, "cafe_id": cafe_id, "position": start + i}
+        for i, cafe_id in enumerate(new_ids)
+    ])
+    return len(new_ids)
+
+
+def remove_collection_cafes(db: Session, collection_id: str, cafe_ids: List[str]) -> int:
+    """Remove cafes from a collection (positions of the others are kept); returns how many were removed"""
+    result = db.execute(collection_cafes.delete().where(
+        collection_cafes.c.collection_id == collection_id,
+        collection_cafes.c.cafe_id.in_(cafe_ids)
+    ))
+    return result.rowcount
+
+
+# ---------------------
+# Paginated members
+# ---------------------
+
+def encode_position_cursor(position: int, cafe_id: str) -> str:
+    raw = json.dumps([position, cafe_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_position_cursor(cursor: str) -> Tuple[int, str]:
+    """Decode a cursor created by encode_position_cursor, raises ValueError if malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        position, cafe_id = json.loads(base64.urlsafe_b64decode(padded))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(position, int) or isinstance(position, bool) or not isinstance(cafe_id, str):
+        raise ValueError("Invalid cursor")
+    return position, cafe_id
+
+
+def collection_cafes_page(
+    db: Session,
+    collection_id: str,
+    sort_by: str = "position",
+    sort_order: str = "asc",
+    cursor: Optional[str] = None,
+    page_size: int = 20
+) -> Tuple[List[Cafe], Optional[str]]:
+    """
+    One page of the cafes of a collection and the cursor of the next page (None on the last).
+    Keyset pagination on (position, cafe id) or, for cafe sorts, on the cafe listing cursor.
+    Raises ValueError on a malformed cursor.
+    """
+    query = db.query(Cafe.id, collection_cafes.c.position).join(
+        collection_cafes, collection_cafes.c.cafe_id == Cafe.id
+    ).filter(collection_cafes.c.collection_id == collection_id)
+
+    direction = desc if sort_order == "desc" else asc
+    if sort_by == "position":
+        position = collection_cafes.c.position
+        query = query.order_by(direction(position), direction(Cafe.id))
+        if cursor:
+            last_position, last_id = decode_position_cursor(cursor)
+            if sort_order == "desc":
+                after = or_(position < last_position, and_(position == last_position, Cafe.id < last_id))
+            else:
+                after = or_(position > last_position, and_(position == last_position, Cafe.id > last_id))
+            query = query.filter(after)
+    else:
+        # Same order and cursor as the cafe listing (NULLS LAST, column, nama, id)
+        sort_column = SORT_FIELDS[sort_by]
+        query = query.order_by(
+            case((sort_column.is_(None), 1), else_=0), direction(sort_column), Cafe.nama, Cafe.id
+        )
+        if cursor:
+            query = apply_cursor(query, cursor, sort_by, sort_order)
+
+    # Fetch one extra row to know whether there is a next page
+    rows = query.limit(page_size + 1).all()
+    page = rows[:page_size]
+    cafes = load_cafes_by_ids(db, [row.id for row in page])
+
+    next_cursor = None
+    if len(rows) > page_size and cafes:
+        if sort_by == "position":
+            next_cursor = encode_position_cursor(page[-1].position, page[-1].id)
+        else:
+            next_cursor = encode_cursor(db, cafes[-1], sort_by)
+    return cafes, next_cursor
@@ -0,0 +1,149 @@
+from typing import Optional, List, Dict, Iterable
+from sqlalchemy.orm import Session
+from config import settings
+from models import Cafe, Facility, cafe_facilities
+import threading
+import time
+
+
+class FacilityBitmapIndex:
+    """
+    In-process bitmap index of cafe facilities.
+
+    Every cafe gets an ordinal, every facility slug a bitset (Python int) of cafe ordinals.
+    Multi-facility filters become a bitwise AND and per-facility counts a popcount.
+    """
+
+    def __init__(self, ttl: float = 300.0):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.cafe_ids: List[Optional[str]] = []  # ordinal -> cafe id (None when deleted)
+        self.ordinals: Dict[str, int] = {}  # cafe id -> ordinal
+        self.bitmaps: Dict[str, int] = {}  # facility slug -> bitset of ordinals
+        self.all_bits = 0
+        self.built_at: Optional[float] = None
+        self.dirty = True
+
+    # ---------------------
+    # Build & maintenance
+    # ---------------------
+
+    def rebuild(self, db: Session) -> None:
+        """Rebuild the whole index from cafes and cafe_facilities"""
+        cafe_ids = [row.id for row in db.query(Cafe.id).order_by(Cafe.id).all()]
+        ordinals = {cafe_id: i for i, cafe_id in enumerate(cafe_ids)}
+
+        bitmaps = {row.slug: 0 for row in db.query(Facility.slug).all()}
+        pairs = db.query(cafe_facilities.c.cafe_id, Facility.slug).join(
+            Facility, Facility.id == cafe_facilities.c.facility_id
+        ).all()
+        for cafe_id, slug in pairs:
+            ordinal = ordinals.get(cafe_id)
+            if ordinal is not None:
+                bitmaps[slug] = bitmaps.get(slug, 0) | (1 << ordinal)
+
+        with self.lock:
+            self.cafe_ids = cafe_ids
+            self.ordinals = ordinals
+            self.bitmaps = bitmaps
+            self.all_bits = (1 << len(cafe_ids)) - 1
+            self.built_at = time.monotonic()
+            self.dirty = False
+
+    def ensure(self, db: Session) -> None:
+        """Rebuild when invalidated or older than the TTL (other workers may have written)"""
+        if self.dirty or self.built_at is None or time.monotonic() - self.built_at > self.ttl:
+            self.rebuild(db)
+
+    def invalidate(self) -> None:
+        """Force a full rebuild on next use (e.g. after facility rename/delete)"""
+        self.dirty = True
+
+    def update_cafe(self, cafe_id: str, facility_slugs: Iterable[str]) -> None:
+        """Set the facilities of a single cafe (create or update)"""
+        if self.dirty:
+            return  # Next ensure() rebuilds everything anyway
+
+        with self.lock:
+            ordinal = self.ordinals.get(cafe_id)
+            if ordinal is None:
+                ordinal = len(self.cafe_ids)
+                self.cafe_ids.append(cafe_id)
+                self.ordinals[cafe_id] = ordinal
+            bit = 1 << ordinal
+            self.all_bits |= bit
+
+            slugs = set(facility_slugs)
+            for slug in slugs:
+                self.bitmaps.setdefault(slug, 0)
+            for slug, bits in self.bitmaps.items():
+                self.bitmaps[slug] = bits | bit if slug in slugs else bits & ~bit
+
+    def remove_cafe(self, cafe_id: str) -> None:
+        """Drop a deleted cafe from all bitsets"""
+        if self.dirty:
+            return
+
+        with self.lock:
+            ordinal = self.ordinals.pop(cafe_id, None)
+            if ordinal is None:
+                return
+            self.cafe_ids[ordinal] = None
+            mask = ~(1 << ordinal)
+            self.all_bits &= mask
+            for slug in self.bitmaps:
+                self.bitmaps[slug] &= mask
+
+    # ---------------------
+    # Queries
+    # ---------------------
+
+    def bits_for_facilities(self, db: Session, slugs: Iterable[str]) -> int:
+        """Bitset of cafes having ALL the given facilities"""
+        self.ensure(db)
+        with self.lock:
+            bits = self.all_bits
+            for slug in set(slugs):
+                bits &= self.bitmaps.get(slug, 0)
+                if not bits:
+                    break
+            return bits
+
+    def bits_for_cafes(self, db: Session, cafe_ids: Iterable[str]) -> int:
+        """Bitset of the given cafe ids (unknown ids are ignored)"""
+        self.ensure(db)
+        bits = 0
+        with self.lock:
+            for cafe_id in cafe_ids:
+                ordinal = self.ordinals.get(cafe_id)
+                if ordinal is not None:
+                    bits |= 1 << ordinal
+        return bits
+
+    def cafe_ids_from_bits(self, bits: int) -> List[str]:
+        """Decode a bitset back into cafe ids"""
+        cafe_ids = []
+        with self.lock:
+            while bits:
+                lowest = bits & -bits
+                cafe_id = self.cafe_ids[lowest.bit_length() - 1]
+                if cafe_id is not None:
+                    cafe_ids.append(cafe_id)
+                bits ^= lowest
+        return cafe_ids
+
+    def cafe_ids_with_all(self, db: Session, slugs: Iterable[str]) -> List[str]:
+        """Ids of cafes having ALL the given facilities"""
+        return self.cafe_ids_from_bits(self.bits_for_facilities(db, slugs))
+
+    def counts(self, db: Session, within: Optional[int] = None) -> Dict[str, int]:
+        """Number of cafes per facility slug, optionally restricted to a bitset of cafes"""
+        self.ensure(db)
+        with self.lock:
+            if within is None:
+                within = self.all_bits
+            return {slug: (bits & within).bit_count() for slug, bits in self.bitmaps.items()}
+
+
+# Singleton instance
+facility_index = FacilityBitmapIndex(ttl=settings.FACILITY_INDEX_TTL_SECONDS)
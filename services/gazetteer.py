@@ -0,0 +1,132 @@
+from typing import Optional, List, Dict, Tuple, NamedTuple
+import re
+
+
+class Place(NamedTuple):
+    name: str  # Canonical name as written in alamat_lengkap
+    kind: str  # "city" or "district"
+    city: Optional[str] = None  # City of a district
+
+
+# Cities found in alamat_lengkap (last address component) with their common aliases
+CITIES: Dict[str, List[str]] = {
+    "Jakarta Selatan": ["jakarta selatan", "jaksel", "jkt selatan", "south jakarta"],
+    "Jakarta Utara": ["jakarta utara", "jakut", "jkt utara", "north jakarta"],
+    "Jakarta Timur": ["jakarta timur", "jaktim", "jkt timur", "east jakarta"],
+    "Jakarta Pusat": ["jakarta pusat", "jakpus", "jkt pusat", "central jakarta"],
+    "Jakarta Barat": ["jakarta barat", "jakbar", "jkt barat", "west jakarta"],
+    "Jakarta": ["jakarta", "jkt", "dki"],
+    "Bekasi": ["bekasi"],
+    "Tangerang Selatan": ["tangerang selatan", "tangsel"],
+    "Tangerang": ["tangerang", "tng"],
+    "Depok": ["depok"],
+    "Bogor": ["bogor"],
+    "Bandung": ["bandung", "bdg"],
+    "Yogyakarta": ["yogyakarta", "jogjakarta", "jogja", "yogya", "jogya"],
+    "Surabaya": ["surabaya", "sby"],
+    "Semarang": ["semarang"],
+    "Malang": ["malang"],
+    "Denpasar": ["denpasar", "bali"],
+}
+
+# Well known areas, mentioned in addresses and queries instead of the city
+DISTRICTS: Dict[str, Tuple[str, List[str]]] = {
+    "Kemang": ("Jakarta Selatan", ["kemang"]),
+    "Senopati": ("Jakarta Selatan", ["senopati"]),
+    "Blok M": ("Jakarta Selatan", ["blok m", "blokm"]),
+    "SCBD": ("Jakarta Selatan", ["scbd"]),
+    "Kuningan": ("Jakarta Selatan", ["kuningan"]),
+    "Kebayoran": ("Jakarta Selatan", ["kebayoran", "kebayoran baru"]),
+    "Panglima Polim": ("Jakarta Selatan", ["panglima polim"]),
+    "Tebet": ("Jakarta Selatan", ["tebet"]),
+    "Cipete": ("Jakarta Selatan", ["cipete"]),
+    "Pondok Indah": ("Jakarta Selatan", ["pondok indah"]),
+    "Senayan": ("Jakarta Selatan", ["senayan"]),
+    "Sudirman": ("Jakarta Pusat", ["sudirman"]),
+    "Menteng": ("Jakarta Pusat", ["menteng"]),
+    "Cikini": ("Jakarta Pusat", ["cikini"]),
+    "Kelapa Gading": ("Jakarta Utara", ["kelapa gading"]),
+    "PIK": ("Jakarta Utara", ["pik", "pantai indah kapuk"]),
+    "Kedoya": ("Jakarta Barat", ["kedoya"]),
+    "Puri Indah": ("Jakarta Barat", ["puri indah"]),
+    "Rawamangun": ("Jakarta Timur", ["rawamangun"]),
+    "Cibubur": ("Jakarta Timur", ["cibubur"]),
+    "Summarecon Bekasi": ("Bekasi", ["summarecon bekasi"]),
+    "BSD": ("Tangerang Selatan", ["bsd", "bsd city"]),
+    "Bintaro": ("Tangerang Selatan", ["bintaro"]),
+    "Gading Serpong": ("Tangerang", ["gading serpong"]),
+    "Karawaci": ("Tangerang", ["karawaci", "lippo karawaci"]),
+    "Margonda": ("Depok", ["margonda"]),
+    "Cinere": ("Depok", ["cinere"]),
+    "Dago": ("Bandung", ["dago"]),
+}
+
+# Names covering several cities: "jakarta" means any of the five Jakarta cities
+CITY_GROUPS: Dict[str, List[str]] = {
+    "Jakarta": ["Jakarta", "Jakarta Selatan", "Jakarta Utara", "Jakarta Timur", "Jakarta Pusat", "Jakarta Barat"],
+}
+
+# Address components naming a street ("Jl. Bandung No. 5") say nothing about the city
+_STREET_PATTERN = re.compile(r"^(jl|jln|jalan|gg|gang)\b")
+
+
+def _build_aliases() -> Dict[str, Place]:
+    aliases: Dict[str, Place] = {}
+    for name, names in CITIES.items():
+        for alias in names:
+            aliases[alias] = Place(name, "city")
+    for name, (city, names) in DISTRICTS.items():
+        for alias in names:
+            aliases[alias] = Place(name, "district", city)
+    return aliases
+
+
+ALIASES = _build_aliases()
+
+# Longest alias first so "jakarta selatan" wins over "jakarta"
+_ALIAS_PATTERN = re.compile(
+    r"\b(" + "|".join(re.escape(a) for a in sorted(ALIASES, key=len, reverse=True)) + r")\b"
+)
+
+
+def find_places(text: str) -> List[Tuple[int, int, Place]]:
+    """(start, end, place) of every place mentioned in lowercase text, longest match first"""
+    return [(m.start(), m.end(), ALIASES[m.group(1)]) for m in _ALIAS_PATTERN.finditer(text)]
+
+
+def resolve_place(text: str) -> Optional[Place]:
+    """Place named by the whole text ("jaksel" -> Jakarta Selatan), None if unknown"""
+    return ALIASES.get(" ".join(text.casefold().split()))
+
+
+def cities_in(city: str) -> List[str]:
+    """Cities a city name covers: itself, or the whole group ("Jakarta")"""
+    return CITY_GROUPS.get(city, [city])
+
+
+def locate_address(address: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    (city, district) of an alamat_lengkap, e.g. "Jl. Kemang Raya No. 8, Jakarta Selatan"
+    -> ("Jakarta Selatan", "Kemang"). Either is None when not recognized.
+
+    The city comes from the last component naming one, street components excluded.
+    A district is only kept when it lies in that city, and fills in a missing city.
+    """
+    if not address:
+        return None, None
+
+    city = None
+    districts = []
+    for component in reversed([c.strip() for c in address.casefold().split(",")]):
+        is_street = _STREET_PATTERN.match(component) is not None
+        for _, _, place in find_places(component):
+            if place.kind == "city" and city is None and not is_street:
+                city = place.name
+            elif place.kind == "district":
+                districts.append(place)
+
+    district = next((d for d in districts if city is None or d.city in cities_in(city)), None)
+    if district is None:
+        return city, None
+    # "Kemang, Jakarta" is in Jakarta Selatan
+    return district.city, district.name
@@ -0,0 +1,143 @@
+from typing import Optional, List, Dict, Tuple, Iterable
+from sqlalchemy.orm import Session
+from config import settings
+from models import Cafe
+import math
+import threading
+import time
+
+
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEGREE_LAT = 111320.0
+
+
+def haversine_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great circle distance in meters"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+class GeoGridIndex:
+    """
+    In-process grid index of cafe coordinates.
+
+    The map is cut into square cells of `cell_degrees`; a radius query only looks at
+    the cells overlapping the circle's bounding box and computes haversine for the
+    cafes in them. Kept up to date per cafe on writes, rebuilt after the TTL.
+    """
+
+    def __init__(self, cell_degrees: float = 0.01, ttl: float = 300.0):
+        self.cell_degrees = cell_degrees
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.cells: Dict[Tuple[int, int], Dict[str, Tuple[float, float]]] = {}  # cell -> cafe id -> (lat, lng)
+        self.positions: Dict[str, Tuple[float, float]] = {}  # cafe id -> (lat, lng)
+        self.built_at: Optional[float] = None
+        self.dirty = True
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return math.floor(lat / self.cell_degrees), math.floor(lng / self.cell_degrees)
+
+    # ---------------------
+    # Build & maintenance
+    # ---------------------
+
+    def rebuild(self, db: Session) -> None:
+        """Rebuild the whole index from the cafe coordinates"""
+        rows = db.query(Cafe.id, Cafe.latitude, Cafe.longitude).filter(
+            Cafe.latitude.isnot(None), Cafe.longitude.isnot(None)
+        ).all()
+
+        cells: Dict[Tuple[int, int], Dict[str, Tuple[float, float]]] = {}
+        positions: Dict[str, Tuple[float, float]] = {}
+        for cafe_id, lat, lng in rows:
+            cells.setdefault(self._cell(lat, lng), {})[cafe_id] = (lat, lng)
+            positions[cafe_id] = (lat, lng)
+
+        with self.lock:
+            self.cells = cells
+            self.positions = positions
+            self.built_at = time.monotonic()
+            self.dirty = False
+
+    def ensure(self, db: Session) -> None:
+        """Rebuild when invalidated or older than the TTL (other workers may have written)"""
+        if self.dirty or self.built_at is None or time.monotonic() - self.built_at > self.ttl:
+            self.rebuild(db)
+
+    def invalidate(self) -> None:
+        self.dirty = True
+
+    def _remove(self, cafe_id: str) -> None:
+        old = self.positions.pop(cafe_id, None)
+        if old is not None:
+            cell = self._cell(*old)
+            self.cells[cell].pop(cafe_id, None)
+            if not self.cells[cell]:
+                del self.cells[cell]
+
+    def update_cafe(self, cafe_id: str, lat: Optional[float], lng: Optional[float]) -> None:
+        """Set the coordinates of a single cafe (create or update), None removes it"""
+        if self.dirty:
+            return  # Next ensure() rebuilds everything anyway
+
+        with self.lock:
+            self._remove(cafe_id)
+            if lat is not None and lng is not None:
+                self.cells.setdefault(self._cell(lat, lng), {})[cafe_id] = (lat, lng)
+                self.positions[cafe_id] = (lat, lng)
+
+    def remove_cafe(self, cafe_id: str) -> None:
+        """Drop a deleted cafe"""
+        if self.dirty:
+            return
+
+        with self.lock:
+            self._remove(cafe_id)
+
+    # ---------------------
+    # Queries
+    # ---------------------
+
+    def _cells_around(self, lat: float, lng: float, radius_m: float) -> Iterable[Tuple[int, int]]:
+        d_lat = radius_m / METERS_PER_DEGREE_LAT
+        # Longitude degrees shrink towards the poles; clamp to keep the box finite
+        d_lng = radius_m / (METERS_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 0.01))
+        min_cell = self._cell(lat - d_lat, lng - d_lng)
+        max_cell = self._cell(lat + d_lat, lng + d_lng)
+
+        box_cells = (max_cell[0] - min_cell[0] + 1) * (max_cell[1] - min_cell[1] + 1)
+        if box_cells > len(self.cells):
+            # Huge box over a sparse map: cheaper to walk the occupied cells
+            return [
+                cell for cell in self.cells
+                if min_cell[0] <= cell[0] <= max_cell[0] and min_cell[1] <= cell[1] <= max_cell[1]
+            ]
+        return [
+            (i, j)
+            for i in range(min_cell[0], max_cell[0] + 1)
+            for j in range(min_cell[1], max_cell[1] + 1)
+        ]
+
+    def within(self, db: Session, lat: float, lng: float, radius_m: float) -> List[Tuple[str, float]]:
+        """(cafe id, distance in meters) of the cafes within radius_m, nearest first"""
+        self.ensure(db)
+        found = []
+        with self.lock:
+            for cell in self._cells_around(lat, lng, radius_m):
+                for cafe_id, (cafe_lat, cafe_lng) in self.cells.get(cell, {}).items():
+                    distance = haversine_m(lat, lng, cafe_lat, cafe_lng)
+                    if distance <= radius_m:
+                        found.append((cafe_id, distance))
+        found.sort(key=lambda item: item[1])
+        return found
+
+
+# Singleton instance
+geo_index = GeoGridIndex(
+    cell_degrees=settings.GEO_INDEX_CELL_DEGREES,
+    ttl=settings.GEO_INDEX_TTL_SECONDS
+)
@@ -0,0 +1,237 @@
+from typing import Optional, List, Dict, Any, Set
+import asyncio
+import random
+import threading
+import time
+
+
+class GroqUnavailableError(Exception):
+    """No Groq key could answer before the deadline"""
+
+
+class CircuitBreaker:
+    """
+    Per-key circuit breaker.
+
+    closed: calls flow; `failure_threshold` consecutive failures open the circuit.
+    open: calls are refused until `reset_timeout` has passed.
+    half_open: a single probe call is let through; success closes, failure re-opens.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.lock = threading.Lock()
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+
+    def available(self) -> bool:
+        """Whether a call may be attempted now (does not reserve the half-open probe)"""
+        with self.lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                return time.monotonic() - self.opened_at >= self.reset_timeout
+            return not self.probing
+
+    def acquire(self) -> bool:
+        """Reserve a call; moves an expired open circuit to half-open and takes its probe"""
+        with self.lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+                self.probing = False
+            if self.probing:
+                return False
+            self.probing = True
+            return True
+
+    def record_success(self) -> None:
+        with self.lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.probing = False
+
+    def record_failure(self) -> None:
+        with self.lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+            self.probing = False
+
+    def release(self) -> None:
+        """Give back a half-open probe whose call was cancelled without an outcome"""
+        with self.lock:
+            self.probing = False
+
+
+class GroqKey:
+    """One API key: its client, breaker and latency estimate"""
+
+    def __init__(self, index: int, client, breaker: CircuitBreaker, initial_latency: float):
+        self.index = index
+        self.client = client
+        self.breaker = breaker
+        self.latency = initial_latency  # EWMA of successful call latency, seconds
+        self.inflight = 0
+        self.calls = 0
+        self.failures = 0
+
+    def weight(self) -> float:
+        """Selection weight: faster and less busy keys are picked more often"""
+        return 1.0 / (self.latency * (1 + self.inflight))
+
+
+class AsyncGroqBalancer:
+    """
+    Async load balancer over multiple Groq API keys.
+
+    Each completion has an overall deadline. If the first key has not answered after
+    `hedge_after` seconds a second key is fired and the first answer wins; failed
+    keys are replaced immediately. Keys are chosen at random weighted by their latency
+    EWMA, and skipped while their circuit breaker is open.
+    """
+
+    def __init__(
+        self,
+        api_keys: List[str],
+        base_url: Optional[str] = None,
+        timeout: float = 8.0,
+        hedge_after: float = 0.8,
+        max_attempts: int = 3,
+        failure_threshold: int = 3,
+        reset_timeout: float = 30.0,
+        ewma_alpha: float = 0.3,
+    ):
+        from groq import AsyncGroq
+        self.timeout = timeout
+        self.hedge_after = hedge_after
+        self.max_attempts = max_attempts
+        self.ewma_alpha = ewma_alpha
+        self.keys = [
+            GroqKey(
+                i,
+                # Retries and timeouts are handled here, not by the SDK
+                AsyncGroq(api_key=key.strip(), base_url=base_url, max_retries=0, timeout=timeout),
+                CircuitBreaker(failure_threshold, reset_timeout),
+                initial_latency=hedge_after,
+            )
+            for i, key in enumerate(k for k in api_keys if k.strip())
+        ]
+
+    @property
+    def is_available(self) -> bool:
+        return len(self.keys) > 0
+
+    @property
+    def client_count(self) -> int:
+        return len(self.keys)
+
+    def _pick(self, tried: Set[int]) -> Optional[GroqKey]:
+        """Weighted random choice among untried keys whose circuit allows a call"""
+        candidates = [k for k in self.keys if k.index not in tried and k.breaker.available()]
+        while candidates:
+            key = random.choices(candidates, weights=[k.weight() for k in candidates])[0]
+            if key.breaker.acquire():
+                return key
+            candidates.remove(key)
+        return None
+
+    async def _call(self, key: GroqKey, params: Dict[str, Any]):
+        key.inflight += 1
+        key.calls += 1
+        started = time.monotonic()
+        try:
+            response = await key.client.chat.completions.create(**params)
+        except asyncio.CancelledError:
+            key.breaker.release()  # Lost the hedge race, says nothing about the key
+            raise
+        except Exception:
+            key.failures += 1
+            key.breaker.record_failure()
+            raise
+        finally:
+            key.inflight -= 1
+
+        elapsed = time.monotonic() - started
+        key.latency += self.ewma_alpha * (elapsed - key.latency)
+        key.breaker.record_success()
+        return response
+
+    async def create_completion(self, **params):
+        """chat.completions.create on the best keys, hedged, within the deadline"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        tried: Set[int] = set()
+        pending: Dict[asyncio.Task, GroqKey] = {}
+        last_error: Optional[Exception] = None
+        start_next = True
+
+        try:
+            while True:
+                if start_next and len(tried) < self.max_attempts:
+                    key = self._pick(tried)
+                    if key is not None:
+                        tried.add(key.index)
+                        pending[asyncio.ensure_future(self._call(key, params))] = key
+                start_next = False
+
+                if not pending:
+                    raise GroqUnavailableError(f"No Groq key available: {last_error}")
+
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    for key in pending.values():
+                        key.failures += 1
+                        key.breaker.record_failure()  # Too slow counts against the key
+                    raise GroqUnavailableError(f"Groq did not answer within {self.timeout}s")
+
+                can_hedge = len(tried) < self.max_attempts
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=min(remaining, self.hedge_after) if can_hedge else remaining,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    start_next = True  # Slow answer: hedge with another key
+                    continue
+
+                for task in done:
+                    pending.pop(task)
+                    try:
+                        return task.result()
+                    except Exception as e:
+                        last_error = e
+                        start_next = True  # Failed: replace it right away
+        finally:
+            for task in pending:
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    # Finished in the same tick as the winner: its outcome is already recorded
+                    # on the key, retrieve the exception so it isn't reported as never retrieved
+                    task.exception()
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Per-key state for monitoring (keys themselves are not exposed)"""
+        return [
+            {
+                "key": key.index,
+                "state": key.breaker.state,
+                "latency_ms": round(key.latency * 1000, 1),
+                "inflight": key.inflight,
+                "calls": key.calls,
+                "failures": key.failures,
+            }
+            for key in self.keys
+        ]
@@ -1,13 +1,24 @@
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Callable, AsyncIterator
 from pydantic import BaseModel
 from config import settings
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, case
 from models import Cafe, Facility, Collection
+from services.cafe_listing import price_category_condition, open_at_condition, load_cafes_by_ids, location_condition
+from services.ranking import rank_cafes
+from services.collection_listing import cafe_counts
+from services.opening_hours import resolve_open_minute
+from services.price_range import PRICE_CATEGORIES
+from services.text_search import text_match, TextMatch
+from services.vector_index import vector_match
+from services.parse_cache import parse_cache
+from services.query_rules import RuleParser
+from services.groq_client import AsyncGroqBalancer
+from services.single_flight import SingleFlight
+from database import SessionLocal
+import anyio
+import asyncio
 import json
 import re
-import random
-import threading
 
 
 class ParsedQuery(BaseModel):
@@ -24,56 +35,8 @@ class ParsedQuery(BaseModel):
     sort_by: Optional[str] = None  # "rating", "reviews", "terbaru"
     entity_type: str = "cafe"  # "cafe", "facility", "collection", "all"
     limit: Optional[int] = None  # jumlah hasil yang diminta user (e.g. "3 cafe" -> 3)
-
-
-class GroqLoadBalancer:
-    """Load balancer for multiple Groq API keys"""
-
-    def __init__(self, api_keys: List[str]):
-        from groq import Groq
-        self.clients = [Groq(api_key=key.strip()) for key in api_keys if key.strip()]
-        self.current_index = 0
-        self.lock = threading.Lock()
-        self.failed_clients = set()  # Track temporarily failed clients
-
-    def get_client(self):
-        """Get next available client using round-robin"""
-        if not self.clients:
-            return None
-
-        with self.lock:
-            # Try to find a working client
-            attempts = len(self.clients)
-            while attempts > 0:
-                client = self.clients[self.current_index]
-                self.current_index = (self.current_index + 1) % len(self.clients)
-
-                # Skip if this client recently failed
-                if id(client) not in self.failed_clients:
-                    return client
-                attempts -= 1
-
-            # All clients failed, reset and try anyway
-            self.failed_clients.clear()
-            return self.clients[0]
-
-    def mark_failed(self, client):
-        """Mark a client as temporarily failed"""
-        with self.lock:
-            self.failed_clients.add(id(client))
-
-    def mark_success(self, client):
-        """Mark a client as working again"""
-        with self.lock:
-            self.failed_clients.discard(id(client))
-
-    @property
-    def is_available(self):
-        return len(self.clients) > 0
-
-    @property
-    def client_count(self):
-        return len(self.clients)
+    open_now: Optional[bool] = False  # "yang buka sekarang"
+    open_at: Optional[str] = None  # jam buka yang diminta, format HH:MM (e.g. "buka malam" -> "21:00")
 
 
 class NLSearchService:
@@ -131,6 +94,12 @@ PENTING tentang search_text:
 - Jika user bilang "cafe untuk nongki" atau "tempat nongkrong", itu adalah INTENT bukan search_text
 - search_text = null untuk kebanyakan query, kecuali user sebut nama spesifik
 
+PENTING tentang jam buka:
+- Jika user minta cafe yang "buka sekarang" / "lagi buka", set open_now = true
+- Jika user minta jam tertentu, isi open_at dengan format HH:MM, contoh: "buka jam 9 malam" -> "21:00"
+- "buka malam" -> "21:00", "buka pagi" -> "07:00", "buka tengah malam" / "buka 24 jam" -> "01:00"
+- Jika tidak disebutkan, open_now = false dan open_at = null
+
 PENTING tentang limit:
 - Jika user menyebutkan ANGKA di awal query seperti "3 cafe", "5 tempat nongkrong", "10 kafe wifi", extract angka tersebut sebagai limit
 - Jika user bilang "beberapa" atau "few" set limit = 3
@@ -150,7 +119,9 @@ Respond dalam format JSON SAJA tanpa markdown code block:
     "intent": null atau intent yang terdeteksi,
     "sort_by": null atau "rating"/"reviews"/"terbaru",
     "entity_type": "cafe" atau "facility" atau "collection" atau "all",
-    "limit": null atau angka 1-100
+    "limit": null atau angka 1-100,
+    "open_now": true atau false,
+    "open_at": null atau "HH:MM"
 }
 
 Contoh:
@@ -324,18 +295,27 @@ Query: "koleksi kafe romantis"
 
     def __init__(self):
         self.load_balancer = None
+        self.rule_parser = RuleParser()
+        self.flights = SingleFlight()  # Coalesces identical in-flight parses and searches
 
         if settings.GROQ_API_KEYS:
             try:
                 api_keys = settings.GROQ_API_KEYS.split(",")
-                self.load_balancer = GroqLoadBalancer(api_keys)
+                self.load_balancer = AsyncGroqBalancer(
+                    api_keys,
+                    base_url=settings.GROQ_BASE_URL,
+                    timeout=settings.GROQ_TIMEOUT_SECONDS,
+                    hedge_after=settings.GROQ_HEDGE_AFTER_MS / 1000,
+                    failure_threshold=settings.GROQ_BREAKER_FAILURES,
+                    reset_timeout=settings.GROQ_BREAKER_RESET_SECONDS
+                )
                 print(f"Initialized Groq load balancer with {self.load_balancer.client_count} clients")
             except Exception as e:
                 print(f"Failed to initialize Groq load balancer: {e}")
 
-    def _parse_with_groq(self, client, query: str) -> ParsedQuery:
-        """Parse query using Groq API"""
-        response = client.chat.completions.create(
+    async def _parse_with_groq(self, query: str) -> ParsedQuery:
+        """Parse query using Groq API (hedged across keys, bounded by the deadline)"""
+        response = await self.load_balancer.create_completion(
             model="llama-3.1-8b-instant",  # Fast and free
             messages=[
                 {"role": "system", "content": self.SYSTEM_PROMPT},
@@ -354,29 +334,126 @@ Query: "koleksi kafe romantis"
         parsed = json.loads(response_text)
         return ParsedQuery(**parsed)
 
-    def parse_query(self, query: str) -> ParsedQuery:
-        """Parse natural language query into structured filters with load balancing"""
+    @staticmethod
+    def _match(db: Session, entity: str, text: str, match_all: bool = True) -> TextMatch:
+        """text_match, or the most similar rows by embedding when NL_SEARCH_MODE is semantic"""
+        if settings.NL_SEARCH_MODE == "semantic":
+            matched = vector_match(db, entity, text)
+            if matched is not None:
+                return matched
+        return text_match(db, entity, text, match_all)
+
+    @staticmethod
+    def _is_cafe_name(db: Session, text: str) -> bool:
+        """Whether words left over by the rule parser match a cafe"""
+        return db.query(Cafe.id).filter(text_match(db, "cafe", text, scored=False).condition).first() is not None
+
+    @staticmethod
+    async def _in_worker(fn: Callable[..., Any], *args) -> Any:
+        """
+        Run fn(db, *args) on a worker thread with its own Session, so the
+        blocking queries and index scoring never hold up the event loop.
+        """
+        def work():
+            db = SessionLocal()
+            try:
+                return fn(db, *args)
+            finally:
+                db.close()
+
+        return await anyio.to_thread.run_sync(work)
+
+    async def parse_query_async(self, query: str, strict: bool = False) -> ParsedQuery:
+        """
+        Parse natural language query into structured filters with load balancing.
+        When the LLM is needed but unavailable or fails, the query falls back to plain
+        search_text, or raises when strict.
+        """
+        # Repeated queries skip parsing altogether
+        cached = await parse_cache.get(query)
+        if cached is not None:
+            return ParsedQuery(**cached)
+
+        # A burst of the same query waits for a single parse
+        result = await self.flights.do(
+            ("parse", parse_cache.normalize(query), strict),
+            lambda: self._parse_uncached(query, strict)
+        )
+        return result.model_copy(deep=True)
+
+    async def _parse_uncached(self, query: str, strict: bool = False) -> ParsedQuery:
+        # Unambiguous queries are parsed locally, only the rest goes to the LLM
+        analyzed = self.rule_parser.analyze(query)
+        if analyzed is not None:
+            fields, name = analyzed
+            if name is not None:
+                if not await self._in_worker(self._is_cafe_name, name):
+                    fields = None
+            if fields is not None:
+                result = ParsedQuery(**fields)
+                await parse_cache.set(query, result.model_dump())
+                return result
+
         if not self.load_balancer or not self.load_balancer.is_available:
+            if strict:
+                raise RuntimeError("Groq is not configured or every key is unavailable")
             # Fallback: return query as search_text if no Groq configured
             return ParsedQuery(search_text=query)
 
-        # Try multiple clients if one fails
-        max_retries = min(3, self.load_balancer.client_count)
-        last_error = None
-
-        for _ in range(max_retries):
-            client = self.load_balancer.get_client()
-            try:
-                result = self._parse_with_groq(client, query)
-                self.load_balancer.mark_success(client)
-                return result
-            except Exception as e:
-                last_error = e
-                self.load_balancer.mark_failed(client)
-                print(f"Groq client failed, trying next: {e}")
+        try:
+            result = await self._parse_with_groq(query)
+        except Exception as e:
+            if strict:
+                raise
+            print(f"Groq parsing failed: {e}")
+            return ParsedQuery(search_text=query)
 
-        print(f"All Groq clients failed: {last_error}")
-        return ParsedQuery(search_text=query)
+        await parse_cache.set(query, result.model_dump())
+        return result
+
+    async def parse_batch(self, queries: List[str], concurrency: int = 8) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Parse many queries, yielding one result per distinct query as soon as it is ready.
+
+        Duplicates (same normalized text) are parsed once. Cached queries are yielded first,
+        the rest go through parse_query_async with at most `concurrency` running at once.
+        A failed or unavailable LLM yields an "error" item instead of the search_text fallback.
+        """
+        unique: Dict[str, str] = {}
+        counts: Dict[str, int] = {}
+        for query in queries:
+            key = parse_cache.normalize(query)
+            if not key:
+                continue
+            unique.setdefault(key, query)
+            counts[key] = counts.get(key, 0) + 1
+
+        pending = []
+        for key, query in unique.items():
+            cached = await parse_cache.get(query)
+            if cached is not None:
+                yield {"query": query, "count": counts[key], "cached": True, "parsed": cached}
+            else:
+                pending.append((key, query))
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def parse(key: str, query: str) -> Dict[str, Any]:
+            async with semaphore:
+                try:
+                    parsed = await self.parse_query_async(query, strict=True)
+                except Exception as e:
+                    return {"query": query, "count": counts[key], "cached": False, "error": str(e)}
+            return {"query": query, "count": counts[key], "cached": False, "parsed": parsed.model_dump()}
+
+        tasks = [asyncio.ensure_future(parse(key, query)) for key, query in pending]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # Client went away: don't keep spending LLM calls on the rest
+            for task in tasks:
+                task.cancel()
 
     def search_cafes(
         self,
@@ -394,18 +471,13 @@ Query: "koleksi kafe romantis"
         query = db.query(Cafe)
 
         # Apply text search
-        if parsed.search_text:
-            search_term = f"%{parsed.search_text}%"
-            query = query.filter(
-                or_(
-                    Cafe.nama.ilike(search_term),
-                    Cafe.alamat_lengkap.ilike(search_term)
-                )
-            )
+        match = self._match(db, "cafe", parsed.search_text) if parsed.search_text else None
+        if match:
+            query = query.filter(match.condition)
 
-        # Apply location filter
+        # Apply location filter (equality on the normalized city/district columns)
         if parsed.location:
-            query = query.filter(Cafe.alamat_lengkap.ilike(f"%{parsed.location}%"))
+            query = query.filter(location_condition(parsed.location))
 
         # Apply rating filters
         if parsed.min_rating is not None:
@@ -413,61 +485,31 @@ Query: "koleksi kafe romantis"
         if parsed.max_rating is not None:
             query = query.filter(Cafe.rating <= parsed.max_rating)
 
-        # Apply price category filter
-        if parsed.price_category:
-            if parsed.price_category == "murah":
-                query = query.filter(
-                    or_(
-                        Cafe.range_price.ilike("%murah%"),
-                        Cafe.range_price.ilike("%10.000%"),
-                        Cafe.range_price.ilike("%15.000%"),
-                        Cafe.range_price.ilike("%20.000%"),
-                        Cafe.range_price.ilike("%25.000%"),
-                    )
-                )
-            elif parsed.price_category == "mahal":
-                query = query.filter(
-                    or_(
-                        Cafe.range_price.ilike("%mahal%"),
-                        Cafe.range_price.ilike("%100.000%"),
-                        Cafe.range_price.ilike("%150.000%"),
-                        Cafe.range_price.ilike("%200.000%"),
-                    )
-                )
-
-        # Apply facility filters
-        if parsed.facilities:
-            for facility_slug in parsed.facilities:
-                query = query.filter(
-                    Cafe.facilities.any(Facility.slug == facility_slug)
-                )
-
-        # Apply sorting (MySQL compatible - use CASE for NULLS LAST)
-        if parsed.sort_by == "rating":
-            query = query.order_by(
-                case((Cafe.rating.is_(None), 1), else_=0),
-                Cafe.rating.desc()
-            )
-        elif parsed.sort_by == "reviews":
-            query = query.order_by(
-                case((Cafe.count_google_review.is_(None), 1), else_=0),
-                Cafe.count_google_review.desc()
-            )
-        elif parsed.sort_by == "terbaru":
-            query = query.order_by(Cafe.created_at.desc())
-        else:
-            # Default: sort by rating
-            query = query.order_by(
-                case((Cafe.rating.is_(None), 1), else_=0),
-                Cafe.rating.desc()
-            )
-
-        # Get total count
-        total = query.count()
-
-        # Apply pagination
-        offset = (page - 1) * page_size
-        cafes = query.offset(offset).limit(page_size).all()
+        # Apply price category filter (range predicate on the parsed price columns)
+        if parsed.price_category in PRICE_CATEGORIES:
+            query = query.filter(price_category_condition(parsed.price_category))
+
+        # Apply opening hours filter
+        try:
+            open_minute = resolve_open_minute(parsed.open_now, parsed.open_at)
+        except ValueError:
+            open_minute = None  # LLM returned an unusable time, ignore it
+        if open_minute is not None:
+            query = query.filter(open_at_condition(open_minute))
+
+        # Rank the candidates by relevance (text, facilities, rating, reviews, intent), one page.
+        # Facilities are a soft filter there: partial matches come after complete ones.
+        page_ids, total = rank_cafes(
+            db,
+            query,
+            parsed.facilities,
+            intent=parsed.intent,
+            text_score=match.score if match else None,
+            sort_by=parsed.sort_by,
+            offset=(page - 1) * page_size,
+            limit=page_size
+        )
+        cafes = load_cafes_by_ids(db, page_ids)
 
         return {
             "items": cafes,
@@ -493,14 +535,11 @@ Query: "koleksi kafe romantis"
 
         query = db.query(Facility)
 
-        if parsed.search_text:
-            search_term = f"%{parsed.search_text}%"
-            query = query.filter(
-                or_(
-                    Facility.name.ilike(search_term),
-                    Facility.description.ilike(search_term)
-                )
-            )
+        match = text_match(db, "facility", parsed.search_text) if parsed.search_text else None
+        if match:
+            query = query.filter(match.condition)
+            if match.score is not None:
+                query = query.order_by(match.score.desc())
 
         total = query.count()
         offset = (page - 1) * page_size
@@ -539,24 +578,19 @@ Query: "koleksi kafe romantis"
 
         query = db.query(Collection).filter(Collection.visibility == 'public')
 
-        # Build search conditions
-        search_conditions = []
-
-        # Add search_text condition
+        # Search terms: search_text plus intent-based keywords
+        search_terms = []
         if parsed.search_text:
-            search_term = f"%{parsed.search_text}%"
-            search_conditions.append(Collection.name.ilike(search_term))
-            search_conditions.append(Collection.description.ilike(search_term))
-
-        # Add intent-based keywords
+            search_terms.append(parsed.search_text)
         if parsed.intent and parsed.intent in self.INTENT_KEYWORDS:
-            for keyword in self.INTENT_KEYWORDS[parsed.intent]:
-                search_conditions.append(Collection.name.ilike(f"%{keyword}%"))
-                search_conditions.append(Collection.description.ilike(f"%{keyword}%"))
+            search_terms.extend(self.INTENT_KEYWORDS[parsed.intent])
 
-        # Apply OR conditions if any
-        if search_conditions:
-            query = query.filter(or_(*search_conditions))
+        # Any term matches (OR), most relevant first
+        if search_terms:
+            match = self._match(db, "collection", " ".join(search_terms), match_all=False)
+            query = query.filter(match.condition)
+            if match.score is not None:
+                query = query.order_by(match.score.desc())
 
         total = query.count()
         offset = (page - 1) * page_size
@@ -564,6 +598,7 @@ Query: "koleksi kafe romantis"
 
         return {
             "items": collections,
+            "cafe_counts": cafe_counts(db, [c.id for c in collections]),
             "total": total,
             "page": page,
             "page_size": page_size,
@@ -571,31 +606,65 @@ Query: "koleksi kafe romantis"
             "parsed_query": parsed.model_dump()
         }
 
-    def search_all(
+    async def execute_search_async(
         self,
-        db: Session,
-        query_text: str,
+        parsed: ParsedQuery,
         page: int = 1,
-        page_size: int = 20
+        page_size: int = 20,
+        serialize: Optional[Callable[[str, Dict[str, Any]], Any]] = None,
+        entities: Optional[List[str]] = None
     ) -> Dict[str, Any]:
-        """Universal search across all entities"""
-        parsed = self.parse_query(query_text)
+        """
+        Search the entities a parsed query asks for, concurrently, each on a worker thread with its own Session.
+        serialize(key, result) runs inside the session, so it may read lazy relationships.
+        entities ("cafes", "facilities", "collections") overrides parsed.entity_type.
+
+        Identical concurrent searches share one execution: the result is shared, read-only.
+        """
+        if entities is None:
+            entities = [
+                key for key, entity_type in (("cafes", "cafe"), ("facilities", "facility"), ("collections", "collection"))
+                if parsed.entity_type in [entity_type, "all"]
+            ]
+        key = (
+            "search",
+            parsed.model_dump_json(),
+            page,
+            page_size,
+            getattr(serialize, "__qualname__", None),
+            tuple(entities)
+        )
+        return await self.flights.do(
+            key, lambda: self._execute_search_async(parsed, page, page_size, serialize, entities)
+        )
 
-        results = {
-            "parsed_query": parsed.model_dump(),
-            "results": {}
+    async def _execute_search_async(
+        self,
+        parsed: ParsedQuery,
+        page: int,
+        page_size: int,
+        serialize: Optional[Callable[[str, Dict[str, Any]], Any]],
+        entities: List[str]
+    ) -> Dict[str, Any]:
+        search_methods = {
+            "cafes": self.search_cafes,
+            "facilities": self.search_facilities,
+            "collections": self.search_collections,
         }
+        searches = {key: search_methods[key] for key in entities}
 
-        if parsed.entity_type in ["cafe", "all"]:
-            results["results"]["cafes"] = self.search_cafes(db, parsed, page, page_size)
-
-        if parsed.entity_type in ["facility", "all"]:
-            results["results"]["facilities"] = self.search_facilities(db, parsed, page, page_size)
+        async def run(key: str, search) -> Any:
+            def work(db: Session):
+                result = search(db, parsed, page, page_size)
+                return serialize(key, result) if serialize else result
 
-        if parsed.entity_type in ["collection", "all"]:
-            results["results"]["collections"] = self.search_collections(db, parsed, page, page_size)
+            return await self._in_worker(work)
 
-        return results
+        values = await asyncio.gather(*(run(key, search) for key, search in searches.items()))
+        return {
+            "parsed_query": parsed.model_dump(),
+            "results": dict(zip(searches, values))
+        }
 
 
 # Singleton instance
@@ -0,0 +1,183 @@
+from typing import Optional, List, Tuple, Dict
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from config import settings
+import re
+
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+# Monday = 0, matching datetime.weekday()
+DAY_NAMES = {
+    "senin": 0, "sen": 0, "monday": 0, "mon": 0,
+    "selasa": 1, "sel": 1, "tuesday": 1, "tue": 1,
+    "rabu": 2, "rab": 2, "wednesday": 2, "wed": 2,
+    "kamis": 3, "kam": 3, "thursday": 3, "thu": 3,
+    "jumat": 4, "jum'at": 4, "jum": 4, "friday": 4, "fri": 4,
+    "sabtu": 5, "sab": 5, "saturday": 5, "sat": 5,
+    "minggu": 6, "ahad": 6, "min": 6, "sunday": 6, "sun": 6,
+}
+
+_DAY = r"(" + "|".join(sorted((re.escape(d) for d in DAY_NAMES), key=len, reverse=True)) + r")\b"
+_TO = r"\s*(?:-|–|—|s/?d|sampai|hingga|to)\s*"
+_TIME = r"(\d{1,2})[:.](\d{2})"
+
+_DAY_RANGE_PATTERN = re.compile(_DAY + _TO + _DAY)
+_DAY_PATTERN = re.compile(r"\b" + _DAY)
+_TIME_RANGE_PATTERN = re.compile(_TIME + _TO + _TIME)
+_EVERY_DAY_PATTERN = re.compile(r"setiap hari|tiap hari|everyday|every day|daily")
+_ALL_DAY_PATTERN = re.compile(r"24\s*(?:jam|hours?|h)\b")
+_CLOSED_PATTERN = re.compile(r"\b(?:tutup|closed|libur)\b")
+
+Interval = Tuple[int, int]
+
+
+def _minutes(hour: str, minute: str) -> Optional[int]:
+    h, m = int(hour), int(minute)
+    if h > 24 or m > 59 or (h == 24 and m > 0):
+        return None
+    return h * 60 + m
+
+
+def _segment_days(segment: str) -> Optional[List[int]]:
+    """Weekdays mentioned in a segment, None when the segment names no day"""
+    if _EVERY_DAY_PATTERN.search(segment):
+        return list(range(7))
+
+    days: List[int] = []
+    for match in _DAY_RANGE_PATTERN.finditer(segment):
+        start, end = DAY_NAMES[match.group(1)], DAY_NAMES[match.group(2)]
+        day = start
+        while True:
+            days.append(day)
+            if day == end:
+                break
+            day = (day + 1) % 7
+    segment = _DAY_RANGE_PATTERN.sub(" ", segment)
+
+    for match in _DAY_PATTERN.finditer(segment):
+        days.append(DAY_NAMES[match.group(1)])
+
+    return sorted(set(days)) if days else None
+
+
+def parse_jam_buka(jam_buka: Optional[str]) -> Optional[Dict[int, List[Interval]]]:
+    """
+    Parse opening hours text into {weekday: [(open_minute, close_minute), ...]}.
+    close_minute may be <= open_minute for places open past midnight.
+    Returns None when the text cannot be understood.
+
+    Examples:
+    - "07:00 - 22:00"
+    - "16:00 - 02:00"
+    - "Buka 24 Jam"
+    - "Senin-Jumat 08:00-22:00, Sabtu-Minggu 09.00-23.00"
+    - "Setiap hari 10:00 - 22:00; Senin tutup"
+    """
+    if not jam_buka:
+        return None
+
+    schedule: Dict[int, List[Interval]] = {}
+    understood = False
+    previous_days: Optional[List[int]] = None
+
+    for segment in re.split(r"[,;\n|]", jam_buka.lower()):
+        segment = segment.strip()
+        if not segment:
+            continue
+
+        days = _segment_days(segment)
+        if days is None:
+            # "08:00-12:00, 13:00-22:00" keeps the days of the previous segment
+            days = previous_days if previous_days is not None else list(range(7))
+        previous_days = days
+
+        if _CLOSED_PATTERN.search(segment):
+            for day in days:
+                schedule[day] = []
+            understood = True
+            continue
+
+        intervals: List[Interval] = []
+        if _ALL_DAY_PATTERN.search(segment):
+            intervals.append((0, MINUTES_PER_DAY))
+        for match in _TIME_RANGE_PATTERN.finditer(segment):
+            open_minute = _minutes(match.group(1), match.group(2))
+            close_minute = _minutes(match.group(3), match.group(4))
+            if open_minute is None or close_minute is None:
+                continue
+            if open_minute == close_minute:
+                open_minute, close_minute = 0, MINUTES_PER_DAY
+            intervals.append((open_minute, close_minute))
+
+        if not intervals:
+            continue
+
+        understood = True
+        for day in days:
+            schedule.setdefault(day, []).extend(intervals)
+
+    return schedule if understood else None
+
+
+def week_intervals(jam_buka: Optional[str]) -> Optional[List[Interval]]:
+    """
+    Opening hours as sorted, merged [start, end) intervals in minutes since Monday 00:00.
+    Intervals past Sunday midnight wrap to Monday. Returns None when unparsable.
+    """
+    schedule = parse_jam_buka(jam_buka)
+    if schedule is None:
+        return None
+
+    intervals: List[Interval] = []
+    for day, day_intervals in schedule.items():
+        base = day * MINUTES_PER_DAY
+        for open_minute, close_minute in day_intervals:
+            start = base + open_minute
+            end = base + close_minute if close_minute > open_minute else base + MINUTES_PER_DAY + close_minute
+            if end > MINUTES_PER_WEEK:
+                intervals.append((start, MINUTES_PER_WEEK))
+                intervals.append((0, end - MINUTES_PER_WEEK))
+            else:
+                intervals.append((start, end))
+
+    merged: List[Interval] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def local_now() -> datetime:
+    """Current time in the cafes' timezone"""
+    return datetime.now(ZoneInfo(settings.CAFE_TIMEZONE))
+
+
+def week_minute(moment: datetime) -> int:
+    """Minutes since Monday 00:00 for a datetime"""
+    return moment.weekday() * MINUTES_PER_DAY + moment.hour * 60 + moment.minute
+
+
+def parse_clock(value: str) -> int:
+    """Parse "HH:MM" (or "HH.MM") into minutes since midnight, raises ValueError"""
+    match = re.fullmatch(r"\s*" + _TIME + r"\s*", value or "")
+    minutes = _minutes(match.group(1), match.group(2)) if match else None
+    if minutes is None or minutes >= MINUTES_PER_DAY:
+        raise ValueError("Time must use HH:MM format, e.g. 21:30")
+    return minutes
+
+
+def resolve_open_minute(open_now: bool = False, open_at: Optional[str] = None) -> Optional[int]:
+    """
+    Week minute to check opening hours against: now, or open_at on today's weekday.
+    Returns None when no opening hours filter is requested.
+    """
+    if not open_now and not open_at:
+        return None
+    now = local_now()
+    if open_at:
+        return now.weekday() * MINUTES_PER_DAY + parse_clock(open_at)
+    return week_minute(now)
@@ -0,0 +1,97 @@
+from typing import Any, Optional, Dict
+from config import settings
+from services.cache import TTLCache
+import json
+import threading
+
+
+class ParseCache:
+    """
+    Cache of parsed natural language queries, keyed on the normalized query text.
+
+    Level 1 is an in-process LRU+TTL cache. Level 2, when PARSE_CACHE_REDIS_URL is set,
+    is a Redis instance shared by all workers, reached through redis.asyncio so a slow or
+    down Redis never blocks the event loop; it is best effort and any Redis error
+    is treated as a miss.
+    """
+
+    def __init__(self, maxsize: int = 4096, ttl: float = 21600.0, redis_url: Optional[str] = None,
+                 prefix: str = "bocah-cafe:parse:"):
+        self.local = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.ttl = ttl
+        self.prefix = prefix
+        self.redis = None
+        self.lock = threading.Lock()
+        self.shared_hits = 0
+        self.shared_misses = 0
+        self.shared_errors = 0
+
+        if redis_url:
+            try:
+                import redis.asyncio
+                self.redis = redis.asyncio.Redis.from_url(redis_url, socket_timeout=0.1, socket_connect_timeout=0.5)
+                print("Initialized shared parse cache on Redis")
+            except Exception as e:
+                print(f"Failed to initialize Redis parse cache, using local cache only: {e}")
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        """Case folded, whitespace collapsed query; digits are kept ("3 cafe" != "5 cafe")"""
+        return " ".join(query.casefold().split())
+
+    def _count(self, counter: str) -> None:
+        with self.lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    async def get(self, query: str) -> Optional[Dict[str, Any]]:
+        """Cached parse result as a dict, None on miss"""
+        key = self.normalize(query)
+        value = self.local.get(key)
+        if value is not None or self.redis is None:
+            return value
+
+        try:
+            raw = await self.redis.get(self.prefix + key)
+        except Exception:
+            self._count("shared_errors")
+            return None
+        if raw is None:
+            self._count("shared_misses")
+            return None
+
+        self._count("shared_hits")
+        value = json.loads(raw)
+        self.local.set(key, value)
+        return value
+
+    async def set(self, query: str, value: Dict[str, Any]) -> None:
+        key = self.normalize(query)
+        self.local.set(key, value)
+        if self.redis is not None:
+            try:
+                await self.redis.set(self.prefix + key, json.dumps(value), ex=int(self.ttl))
+            except Exception:
+                self._count("shared_errors")
+
+    def clear(self) -> None:
+        """Clear the local level (shared entries expire on their own)"""
+        self.local.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {"local": self.local.stats(), "shared": None}
+        if self.redis is not None:
+            with self.lock:
+                stats["shared"] = {
+                    "hits": self.shared_hits,
+                    "misses": self.shared_misses,
+                    "errors": self.shared_errors,
+                }
+        return stats
+
+
+# Singleton instance
+parse_cache = ParseCache(
+    maxsize=settings.PARSE_CACHE_SIZE,
+    ttl=settings.PARSE_CACHE_TTL_SECONDS,
+    redis_url=settings.PARSE_CACHE_REDIS_URL
+)
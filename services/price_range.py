@@ -0,0 +1,99 @@
+from typing import Optional, Tuple, List
+import re
+
+
+# Price categories used by facets and NL search, as [low, high) bounds on the cheapest price
+PRICE_CATEGORIES = {
+    "murah": (None, 30000),
+    "sedang": (30000, 70000),
+    "mahal": (70000, None),
+}
+
+PRICE_CATEGORY_LABELS = {
+    "murah": "< Rp 30.000",
+    "sedang": "Rp 30.000 - Rp 70.000",
+    "mahal": "> Rp 70.000",
+}
+
+_MULTIPLIERS = {
+    "rb": 1000,
+    "ribu": 1000,
+    "k": 1000,
+    "jt": 1000000,
+    "juta": 1000000,
+}
+
+# "18.000", "18,000", "18rb", "25 ribu", "1,5jt", "100k"
+_AMOUNT_PATTERN = re.compile(
+    r"(\d+(?:[.,]\d{3})+|\d+(?:[.,]\d{1,2})?)\s*(rb|ribu|k|jt|juta)?\b",
+    re.IGNORECASE
+)
+
+
+def _to_number(digits: str) -> float:
+    """Convert an Indonesian formatted number ("18.000", "1,5") to float"""
+    if re.fullmatch(r"\d+(?:[.,]\d{3})+", digits):
+        return float(re.sub(r"[.,]", "", digits))
+    return float(digits.replace(",", "."))
+
+
+def parse_range_price(range_price: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Parse free text price ranges into (price_min, price_max) in Rupiah.
+
+    Examples:
+    - "Rp 18.000 - Rp 45.000" -> (18000, 45000)
+    - "Rp 25-50 rb"           -> (25000, 50000)
+    - "Rp 100 rb+"            -> (100000, None)
+    - "< Rp 30.000"           -> (None, 30000)
+    """
+    if not range_price:
+        return None, None
+
+    text = range_price.strip()
+    matches = list(_AMOUNT_PATTERN.finditer(text))
+    if not matches:
+        return None, None
+
+    amounts: List[float] = []
+    suffixes: List[Optional[str]] = []
+    for match in matches:
+        amounts.append(_to_number(match.group(1)))
+        suffixes.append(match.group(2).lower() if match.group(2) else None)
+
+    # A trailing unit applies to bare numbers before it ("25-50 rb")
+    last_multiplier = 1
+    for i in range(len(amounts) - 1, -1, -1):
+        if suffixes[i]:
+            last_multiplier = _MULTIPLIERS[suffixes[i]]
+            amounts[i] *= last_multiplier
+        elif amounts[i] < 1000:
+            amounts[i] *= last_multiplier
+
+    values = [int(round(a)) for a in amounts if a > 0]
+    if not values:
+        return None, None
+
+    low, high = min(values), max(values)
+
+    if len(values) == 1:
+        if re.search(r"^\s*(<|kurang dari|di bawah|dibawah|max|maks)", text, re.IGNORECASE):
+            return None, high
+        if re.search(r"(\+|ke atas|keatas)\s*$", text) or re.search(r"^\s*(>|lebih dari|di atas|diatas|mulai|min)", text, re.IGNORECASE):
+            return low, None
+
+    return low, high
+
+
+def price_category(price_min: Optional[int], price_max: Optional[int] = None) -> Optional[str]:
+    """Category ("murah", "sedang", "mahal") of a parsed price range"""
+    if price_min is not None:
+        price = price_min
+    elif price_max is not None:
+        price = price_max - 1  # Only an upper bound ("< Rp 30.000"), prices stay below it
+    else:
+        return None
+    for category, (low, high) in PRICE_CATEGORIES.items():
+        if (low is None or price >= low) and (high is None or price < high):
+            return category
+    return None
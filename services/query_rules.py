@@ -0,0 +1,299 @@
+from typing import Optional, List, Dict, Any, Callable, Tuple
+from services.gazetteer import find_places
+import re
+
+
+# Keyword tables mirroring NLSearchService.SYSTEM_PROMPT.
+# Phrases are matched on the case folded query, longest phrase first.
+
+FACILITY_KEYWORDS = {
+    "wifi": ["wifi", "wi fi", "wi-fi", "free wifi", "internet", "internetan"],
+    "ac": ["ac", "ber ac", "ber-ac", "pendingin ruangan", "pendingin", "full ac"],
+    "mushola": ["mushola", "musholla", "musola", "mushalla", "musala", "tempat ibadah", "tempat sholat",
+                "tempat solat", "sholat", "solat"],
+    "toilet": ["toilet", "wc", "kamar mandi", "restroom"],
+    "parking": ["parkir", "parkiran", "parking", "tempat parkir", "lahan parkir", "parkir luas"],
+    "outdoor": ["outdoor", "area outdoor", "luar ruangan", "rooftop", "garden", "taman"],
+    "indoor": ["indoor", "area indoor", "dalam ruangan"],
+    "smoking-area": ["smoking area", "smoking", "area merokok", "bisa merokok", "bisa ngerokok", "ngerokok",
+                     "merokok", "ngudud"],
+    "meeting-room": ["meeting room", "ruang meeting", "ruang rapat", "ruangan meeting", "private room",
+                     "ruang privat"],
+    "power-outlet": ["power outlet", "colokan", "colokan listrik", "stop kontak", "stopkontak", "charger",
+                     "charging", "ngecas", "ngecharge"],
+    "pet-friendly": ["pet friendly", "pet-friendly", "petfriendly", "bawa hewan", "bawa kucing",
+                     "bawa anjing", "anabul"],
+    "live-music": ["live music", "live musik", "musik live", "akustik", "acoustic"],
+    "board-games": ["board games", "board game", "boardgame", "boardgames", "board-games"],
+}
+
+PRICE_KEYWORDS = {
+    "murah": ["murah", "murmer", "murah meriah", "terjangkau", "hemat", "ekonomis", "affordable", "cheap",
+              "ramah kantong", "harga mahasiswa", "budget"],
+    "sedang": ["harga sedang", "menengah", "harga standar", "standar", "mid range"],
+    "mahal": ["mahal", "mewah", "premium", "fancy", "luxury", "high end", "elit", "elite"],
+}
+
+INTENT_KEYWORDS = {
+    "kerja": ["kerja", "wfh", "wfc", "wfa", "remote", "kerja remote", "ngantor", "laptopan", "work",
+              "working", "nugas kantor"],
+    "nongkrong": ["nongkrong", "nongki", "hangout", "hang out", "santai", "chill", "ngobrol", "kumpul",
+                  "ngumpul", "ngumpul bareng", "nyantai"],
+    "meeting": ["meeting", "rapat", "ketemu klien", "ketemu client", "klien", "client", "bisnis",
+                "korporat", "corporate"],
+    "foto": ["foto", "foto foto", "foto-foto", "aesthetic", "estetik", "estetis", "instagramable",
+             "instagrammable", "instagenic", "photogenic", "spot foto"],
+    "belajar": ["belajar", "nugas", "study", "ngerjain tugas", "tugas", "skripsi", "skripsian"],
+    "kencan": ["kencan", "date", "dating", "ngedate", "nge date", "romantis", "romantic", "pacaran",
+               "couple", "candle light"],
+}
+
+SORT_KEYWORDS = {
+    "rating": ["terbaik", "paling bagus", "paling enak", "best", "rating terbaik", "rating tertinggi"],
+    "reviews": ["populer", "terpopuler", "paling populer", "paling ramai", "ramai", "rame", "hits", "viral",
+                "review terbanyak", "banyak review", "paling banyak review"],
+    "terbaru": ["terbaru", "baru buka", "paling baru", "newest", "baru"],
+}
+
+# "rating tinggi" -> min_rating 4.0 and sort by rating (see SYSTEM_PROMPT examples)
+HIGH_RATING_KEYWORDS = ["rating tinggi", "rating bagus", "rating tinggi banget", "bintang tinggi",
+                        "high rating", "rating oke"]
+
+ENTITY_KEYWORDS = {
+    "collection": ["koleksi", "collection", "collections", "kurasi", "kurasian", "curated"],
+}
+
+# Words that say "cafe" without narrowing the search
+CAFE_WORDS = {
+    "cafe", "kafe", "caffe", "cafes", "kafe2", "coffee", "coffeeshop", "kedai", "warkop", "kopi",
+    "ngopi", "tempat", "tempat2", "spot", "resto", "shop",
+}
+
+FILLER_WORDS = CAFE_WORDS | {
+    "yang", "yg", "di", "ke", "dengan", "dgn", "ada", "punya", "buat", "untuk", "utk", "dan", "sama",
+    "plus", "atau", "daerah", "area", "sekitar", "sekitaran", "deket", "dekat", "kawasan", "wilayah",
+    "cari", "carikan", "cariin", "mau", "pengen", "pingin", "ingin", "butuh", "rekomendasi", "rekomen",
+    "rekom", "recommend", "recommended", "saran", "tolong", "dong", "donk", "nih", "sih", "ya", "aja",
+    "saja", "banget", "bgt", "juga", "nya", "tempatnya", "cafenya", "list", "daftar", "the", "a", "of",
+    "in", "with", "for", "near", "enak", "bagus", "asik", "asyik", "nyaman", "cozy", "cocok", "kota",
+    "harga", "harganya", "fasilitas", "lengkap",
+}
+
+QUESTION_WORDS = {"apa", "apakah", "siapa", "gimana", "bagaimana", "kenapa", "mengapa", "kapan", "berapa",
+                  "what", "who", "why", "how", "when"}
+
+# Negations change the meaning of what follows ("tanpa smoking area"), leave those to the LLM
+NEGATION_WORDS = {"tanpa", "bukan", "tidak", "gak", "ga", "nggak", "ngga", "enggak", "jangan", "kecuali",
+                  "selain", "no", "non", "without"}
+
+_GREETING = re.compile(
+    r"^(?:halo+|hallo+|hai+|hi+|hello+|helo+|hey+|hei+|pagi|siang|sore|malam|"
+    r"selamat (?:pagi|siang|sore|malam)|assalamu'?alaikum|assalamualaikum|permisi|woi|oi|p)"
+    r"(?: (?:min|kak|kakak|bro|sis|gan|bang|bot|semua|guys|juga|ya))?$"
+)
+_IDENTITY = re.compile(
+    r"^(?:(?:kamu|lu|lo|loe|elu|elo|anda|km|u) (?:itu )?siapa|siapa (?:kamu|lu|lo|loe|elu|elo|anda|km)"
+    r"|who are you|what are you|(?:kamu|lu|lo|anda) (?:itu )?apa|kamu bot)\b"
+)
+_CREATOR = re.compile(
+    r"\b(?:siapa (?:yang |yg )?(?:buat|bikin|membuat|pembuat|ngembangin|developer|dev|creator)"
+    r"|(?:pembuat|developer|dev|creator)(?:nya)? siapa|who (?:made|created|built|developed))\b"
+)
+
+_OPEN_NOW = re.compile(
+    r"\b(?:(?:yang |yg )?(?:lagi|masih|sedang) buka(?: sekarang| saat ini| skrg)?"
+    r"|buka (?:sekarang|saat ini|skrg|sekarang ini|now)|open now)\b"
+)
+_OPEN_ALL_NIGHT = re.compile(r"\b(?:buka )?24 ?(?:jam|hours?)\b|\bbuka (?:sampai |sampe )?tengah malam\b")
+_OPEN_AT = re.compile(
+    r"\bbuka (?:sampai |sampe |hingga )?(?:jam |pukul )(\d{1,2})(?:[:.](\d{2}))? ?(pagi|siang|sore|malam)?\b"
+)
+_OPEN_PERIOD = re.compile(r"\bbuka (?:sampai |sampe |hingga )?(pagi|malam)\b|\b(?:sampai|sampe) malam\b")
+_MAX_RATING = re.compile(
+    r"\b(?:rating|bintang) ?(?:di ?bawah|maksimal|max|kurang dari|<=?) ?(\d(?:[.,]\d)?)\b"
+)
+_MIN_RATING = re.compile(
+    r"\b(?:rating|bintang|rate) ?(?:di ?atas|minimal|min|minimum|lebih dari|>=?)? ?(\d(?:[.,]\d)?)"
+    r"(?: ?(?:ke ?atas|\+))?(?=\s|$)"
+)
+_LEADING_LIMIT = re.compile(r"^(?:top )?(\d{1,3}) (?!jam\b|rb\b|ribu\b|k\b)")
+_TOP_LIMIT = re.compile(r"\btop (\d{1,3})\b")
+_SOME = re.compile(r"\b(?:beberapa|few)\b")
+
+PERIOD_TIMES = {"pagi": "07:00", "malam": "21:00"}
+
+
+def _build_phrases() -> List[Tuple[str, str, str]]:
+    phrases = []
+    for kind, table in (
+        ("facility", FACILITY_KEYWORDS),
+        ("price", PRICE_KEYWORDS),
+        ("intent", INTENT_KEYWORDS),
+        ("sort", SORT_KEYWORDS),
+        ("entity", ENTITY_KEYWORDS),
+    ):
+        for value, keywords in table.items():
+            phrases.extend((keyword, kind, value) for keyword in keywords)
+    phrases.extend((keyword, "high_rating", "rating") for keyword in HIGH_RATING_KEYWORDS)
+    return phrases
+
+
+_PHRASES = {phrase: (kind, value) for phrase, kind, value in _build_phrases()}
+_PHRASE_PATTERN = re.compile(
+    r"(?<![\w-])(" + "|".join(re.escape(p) for p in sorted(_PHRASES, key=len, reverse=True)) + r")(?![\w-])"
+)
+
+
+def normalize_query(query: str) -> str:
+    """Case fold, keep letters, digits, "-", ":" and "." (times, decimals), collapse whitespace"""
+    text = query.casefold()
+    text = re.sub(r"[^\w\s:.,'+<>=-]", " ", text)
+    text = re.sub(r"(?<!\d)[.,]|[.,](?!\d)", " ", text)
+    return " ".join(text.split())
+
+
+def _clock(hour: int, minute: int, period: Optional[str]) -> Optional[str]:
+    """ "9", "malam" -> "21:00" """
+    if period in ("pagi", "malam") and hour == 12:
+        hour = 0
+    elif period == "siang" and hour <= 4:
+        hour += 12
+    elif period == "sore" and hour < 12:
+        hour += 12
+    elif period == "malam" and 6 <= hour < 12:
+        hour += 12
+    if hour > 23 or minute > 59:
+        return None
+    return f"{hour:02d}:{minute:02d}"
+
+
+class RuleParser:
+    """
+    Deterministic parser for the common, unambiguous queries.
+
+    analyze() returns the ParsedQuery fields (and any leftover cafe name), or None when the query
+    holds anything it does not understand (the caller then asks the LLM).
+    """
+
+    def analyze(self, query: str) -> Optional[Tuple[Dict[str, Any], Optional[str]]]:
+        """
+        Parse without touching the database: (fields, name) where name is the leftover
+        text the caller still has to confirm as a cafe name (None if nothing is left over),
+        or None when the query is ambiguous.
+        """
+        text = normalize_query(query)
+        if not text:
+            return None
+
+        if _GREETING.match(text):
+            return {"is_relevant": False, "query_type": "greeting"}, None
+        if _IDENTITY.match(text):
+            return {"is_relevant": False, "query_type": "identity"}, None
+        if _CREATOR.search(text):
+            return {"is_relevant": False, "query_type": "creator"}, None
+
+        if NEGATION_WORDS.intersection(text.split()):
+            return None
+
+        fields: Dict[str, Any] = {"facilities": []}
+
+        def consume(pattern: re.Pattern, handler: Callable[[re.Match], Optional[bool]]) -> bool:
+            """Apply handler to every match and blank the matched text, False if the handler rejects"""
+            nonlocal text
+            for match in list(pattern.finditer(text)):
+                if handler(match) is False:
+                    return False
+            text = pattern.sub(" ", text)
+            return True
+
+        def open_now(match):
+            fields["open_now"] = True
+
+        def open_all_night(match):
+            fields["open_at"] = "01:00"
+
+        def open_at(match):
+            clock = _clock(int(match.group(1)), int(match.group(2) or 0), match.group(3))
+            if clock is None:
+                return False
+            fields["open_at"] = clock
+
+        def open_period(match):
+            fields["open_at"] = PERIOD_TIMES[match.group(1) or "malam"]
+
+        def rating(field):
+            def handler(match):
+                value = float(match.group(1).replace(",", "."))
+                if value > 5:
+                    return False
+                fields[field] = value
+            return handler
+
+        def limit(match):
+            fields["limit"] = max(1, min(int(match.group(1)), 100))
+            if match.group(0).startswith("top"):
+                fields.setdefault("sort_by", "rating")
+
+        def some(match):
+            fields.setdefault("limit", 3)
+
+        for pattern, handler in (
+            (_OPEN_NOW, open_now),
+            (_OPEN_ALL_NIGHT, open_all_night),
+            (_OPEN_AT, open_at),
+            (_OPEN_PERIOD, open_period),
+            (_MAX_RATING, rating("max_rating")),
+            (_MIN_RATING, rating("min_rating")),
+            (_TOP_LIMIT, limit),
+            (_LEADING_LIMIT, limit),
+            (_SOME, some),
+        ):
+            if not consume(pattern, handler):
+                return None
+
+        conflicts = False
+
+        def phrase(match):
+            nonlocal conflicts
+            kind, value = _PHRASES[match.group(1)]
+            if kind == "facility":
+                if value not in fields["facilities"]:
+                    fields["facilities"].append(value)
+                return
+            if kind == "high_rating":
+                fields.setdefault("min_rating", 4.0)
+                kind = "sort"
+            key = {"price": "price_category", "intent": "intent", "sort": "sort_by", "entity": "entity_type"}[kind]
+            if fields.get(key, value) != value and kind != "sort":
+                conflicts = True  # "murah" and "mahal" in one query
+            fields.setdefault(key, value)
+
+        consume(_PHRASE_PATTERN, phrase)
+        if conflicts:
+            return None
+
+        places = {place.name for _, _, place in find_places(text)}
+        if len(places) > 1:
+            return None
+        if places:
+            fields["location"] = places.pop()
+            for start, end, _ in reversed(find_places(text)):
+                text = text[:start] + " " + text[end:]
+
+        words = text.split()
+        if QUESTION_WORDS.intersection(words):
+            return None
+        leftover = [w for w in words if w not in FILLER_WORDS]
+
+        name = None
+        if leftover:
+            name = " ".join(leftover)
+            if not re.fullmatch(r"[\w' -]+", name):
+                return None
+            fields["search_text"] = name
+        elif len(fields) == 1 and not fields["facilities"] and not set(words) & CAFE_WORDS:
+            return None  # Only filler words, nothing to search for
+
+        fields["query_type"] = "search"
+        fields["is_relevant"] = True
+        return fields, name
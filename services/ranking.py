@@ -0,0 +1,139 @@
+from typing import Optional, List, Dict, Tuple, NamedTuple, Any
+from sqlalchemy.orm import Query, Session
+from sqlalchemy import case, desc, exists, func, literal, or_
+from config import settings
+from models import Cafe, Facility, cafe_facilities
+import math
+
+
+# Facility names used by the parser (see services/query_rules.py) that are stored
+# under other slugs: a cafe with any of them has the requested facility
+FACILITY_SLUG_ALIASES = {
+    "parking": ["car-parking", "motorcycle-parking"],
+    "meeting-room": ["private-room"],
+}
+
+# Facilities that make a cafe fit an intent
+INTENT_FACILITIES = {
+    "kerja": ["wifi", "power-outlet", "ac"],
+    "belajar": ["wifi", "power-outlet", "ac", "non-smoking"],
+    "meeting": ["wifi", "private-room", "reservation", "ac"],
+    "nongkrong": ["outdoor", "smoking-area", "live-music"],
+    "foto": ["outdoor"],
+    "kencan": ["live-music", "outdoor", "reservation"],
+}
+
+
+class RankingWeights(NamedTuple):
+    """Weight of each relevance feature, every feature being scaled to 0..1"""
+    text: float = 3.0
+    facility: float = 2.0
+    rating: float = 1.0
+    reviews: float = 0.5
+    intent: float = 1.0
+
+    @classmethod
+    def from_settings(cls) -> "RankingWeights":
+        return cls(
+            text=settings.RANK_WEIGHT_TEXT,
+            facility=settings.RANK_WEIGHT_FACILITY,
+            rating=settings.RANK_WEIGHT_RATING,
+            reviews=settings.RANK_WEIGHT_REVIEWS,
+            intent=settings.RANK_WEIGHT_INTENT,
+        )
+
+
+def _facility_ids(db: Session, slugs: List[str]) -> Dict[str, List[str]]:
+    """Requested facility -> ids of the facilities standing for it (itself or its aliases)"""
+    wanted = {slug: FACILITY_SLUG_ALIASES.get(slug, [slug]) for slug in dict.fromkeys(slugs)}
+    all_slugs = {alias for aliases in wanted.values() for alias in aliases}
+    ids_by_slug: Dict[str, str] = dict(
+        db.query(Facility.slug, Facility.id).filter(Facility.slug.in_(all_slugs)).all()
+    ) if all_slugs else {}
+    return {
+        slug: [ids_by_slug[alias] for alias in aliases if alias in ids_by_slug]
+        for slug, aliases in wanted.items()
+    }
+
+
+def _has_any(facility_ids: List[str]):
+    """Whether the cafe has one of the facilities (a primary key lookup on cafe_facilities)"""
+    if not facility_ids:
+        return literal(False)
+    return exists().where(
+        cafe_facilities.c.cafe_id == Cafe.id,
+        cafe_facilities.c.facility_id.in_(facility_ids)
+    )
+
+
+def _count_present(conditions: List[Any]):
+    """How many of the conditions hold, as an integer expression"""
+    return sum((case((condition, 1), else_=0) for condition in conditions), literal(0))
+
+
+def rank_cafes(
+    db: Session,
+    query: Query,
+    facilities: List[str],
+    intent: Optional[str] = None,
+    text_score: Optional[Any] = None,
+    sort_by: Optional[str] = None,
+    offset: int = 0,
+    limit: int = 20,
+    weights: Optional[RankingWeights] = None
+) -> Tuple[List[str], int]:
+    """
+    One page of the ids of the cafes selected by `query`, ordered by hybrid relevance,
+    and the total number of candidates:
+
+        text * text_score / best text_score
+      + facility * requested facilities present / requested
+      + rating * rating / 5
+      + reviews * ln(1 + reviews) / ln(1 + most reviews)
+      + intent * facilities fitting the intent present / fitting the intent
+
+    The score is computed and sorted by the database (ORDER BY ... LIMIT), candidates are
+    never loaded: one aggregate query gives the total and the normalizers, one query the page.
+
+    Requested facilities are a soft filter: cafes having at least one of them are kept,
+    complete matches rank first. An explicit sort_by ("rating", "reviews", "terbaru")
+    orders by facility coverage, then that column, then relevance.
+    """
+    weights = weights or RankingWeights.from_settings()
+
+    requested = _facility_ids(db, facilities) if facilities else {}
+    present = [_has_any(ids) for ids in requested.values()]
+    coverage = _count_present(present)
+    if present:
+        query = query.filter(or_(*present))
+
+    intent_ids = _facility_ids(db, INTENT_FACILITIES.get(intent or "", [])) if weights.intent else {}
+
+    # Total and normalizers over the candidates
+    aggregates = [func.count(Cafe.id), func.max(Cafe.count_google_review)]
+    if text_score is not None:
+        aggregates.append(func.max(text_score))
+    row = query.with_entities(*aggregates).one()
+    total, most_reviews = row[0], row[1] or 0
+    best_text = float(row[2] or 0) if text_score is not None else 0.0
+    if total == 0:
+        return [], 0
+
+    score = weights.rating * func.coalesce(Cafe.rating, 0) / 5.0
+    if most_reviews > 0:
+        score += weights.reviews * func.ln(1 + func.coalesce(Cafe.count_google_review, 0)) / math.log1p(most_reviews)
+    if best_text > 0:
+        score += weights.text * text_score / best_text
+    if present:
+        score += weights.facility * coverage / len(present)
+    if intent_ids:
+        score += weights.intent * _count_present([_has_any(ids) for ids in intent_ids.values()]) / len(intent_ids)
+
+    if sort_by in ("rating", "reviews", "terbaru"):
+        column = {"rating": Cafe.rating, "reviews": Cafe.count_google_review, "terbaru": Cafe.created_at}[sort_by]
+        order = [desc(coverage), case((column.is_(None), 1), else_=0), desc(column), desc(score), Cafe.id]
+    else:
+        order = [desc(score), Cafe.id]
+
+    rows = query.with_entities(Cafe.id).order_by(*order).offset(offset).limit(limit).all()
+    return [row.id for row in rows], total
@@ -0,0 +1,51 @@
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+import asyncio
+import threading
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Request coalescing: concurrent calls with the same key share one in-flight task.
+
+    The first caller starts the work, later callers await the same task until it
+    finishes. Results (and exceptions) are handed to every waiter, so shared results
+    must be treated as read-only. Nothing is kept after completion, use a cache for that.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.lock = threading.Lock()
+        self.executed = 0
+        self.shared = 0
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # Mark retrieved when every waiter went away
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        loop = asyncio.get_running_loop()
+        task = self._inflight.get(key)
+        if task is None or task.get_loop() is not loop:
+            task = loop.create_task(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+            with self.lock:
+                self.executed += 1
+        else:
+            with self.lock:
+                self.shared += 1
+
+        # A waiter being cancelled (client went away) must not cancel the shared work
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "in_flight": len(self._inflight),
+                "executed": self.executed,
+                "shared": self.shared,
+            }
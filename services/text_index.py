@@ -0,0 +1,169 @@
+from typing import List, Dict, Tuple, Iterable, Optional, Set
+from bisect import bisect_left
+import math
+import re
+import unicodedata
+
+
+# Words that carry no meaning for cafe/facility/collection search
+STOPWORDS = {
+    "yang", "dan", "di", "ke", "dari", "untuk", "buat", "dengan", "atau", "ini", "itu",
+    "ada", "juga", "aja", "saja", "the", "of", "and", "a", "an", "in", "at", "for",
+    "jl", "jln", "no", "lt", "rt", "rw", "kav",
+}
+
+# Spelling variants and slang mapped onto one token
+NORMALIZATIONS = {
+    "cafe": "kafe", "caffe": "kafe", "cafee": "kafe", "coffeeshop": "kafe",
+    "coffee": "kopi", "ngopi": "kopi",
+    "nongki": "nongkrong", "hangout": "nongkrong",
+    "jalan": "jl",
+    "jkt": "jakarta", "jaksel": "jakarta selatan", "jakbar": "jakarta barat",
+    "jaktim": "jakarta timur", "jakut": "jakarta utara", "jakpus": "jakarta pusat",
+    "bdg": "bandung", "tangsel": "tangerang selatan",
+    "wi-fi": "wifi",
+}
+
+# Particles and possessive suffixes stripped from Indonesian words ("kopinya" -> "kopi")
+_SUFFIXES = ("nya", "lah", "kah", "pun", "ku", "mu")
+
+_WORD_PATTERN = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+
+
+def _stem(word: str) -> str:
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            return word[:-len(suffix)]
+    return word
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercase, strip accents, normalize slang, drop stopwords and strip particles"""
+    if not text:
+        return []
+
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+
+    tokens = []
+    for word in _WORD_PATTERN.findall(text):
+        # "wi-fi" is normalized whole, other hyphenated words ("power-outlet") index each part
+        for part in NORMALIZATIONS.get(word, word).replace("-", " ").split():
+            part = NORMALIZATIONS.get(part, part)
+            for token in part.split():
+                if token not in STOPWORDS:
+                    tokens.append(_stem(token))
+    return tokens
+
+
+class InvertedIndex:
+    """
+    In-process inverted index with BM25 scoring.
+
+    Documents are made of weighted fields, e.g. {"nama": 2.0, "alamat": 1.0}:
+    a token in a field counts `weight` times towards its term frequency.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[str, float]] = {}  # term -> {doc_id: tf}
+        self.doc_terms: Dict[str, Dict[str, float]] = {}  # doc_id -> {term: tf}
+        self.doc_lengths: Dict[str, float] = {}
+        self.total_length = 0.0
+        self._vocabulary: Optional[List[str]] = None
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def add(self, doc_id: str, fields: Iterable[Tuple[Optional[str], float]]) -> None:
+        """Index (or re-index) a document from (text, weight) pairs"""
+        self.remove(doc_id)
+
+        terms: Dict[str, float] = {}
+        for text, weight in fields:
+            for token in tokenize(text):
+                terms[token] = terms.get(token, 0.0) + weight
+        if not terms:
+            return
+
+        length = sum(terms.values())
+        self.doc_terms[doc_id] = terms
+        self.doc_lengths[doc_id] = length
+        self.total_length += length
+        for term, tf in terms.items():
+            self.postings.setdefault(term, {})[doc_id] = tf
+        self._vocabulary = None
+
+    def remove(self, doc_id: str) -> None:
+        terms = self.doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        self.total_length -= self.doc_lengths.pop(doc_id)
+        for term in terms:
+            docs = self.postings.get(term)
+            if docs is not None:
+                docs.pop(doc_id, None)
+                if not docs:
+                    del self.postings[term]
+        self._vocabulary = None
+
+    def _expand_prefix(self, prefix: str, max_terms: int = 50) -> List[str]:
+        """Indexed terms starting with prefix (for the word the user is still typing)"""
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.postings)
+        terms = []
+        i = bisect_left(self._vocabulary, prefix)
+        while i < len(self._vocabulary) and self._vocabulary[i].startswith(prefix) and len(terms) < max_terms:
+            terms.append(self._vocabulary[i])
+            i += 1
+        return terms
+
+    def _idf(self, term: str) -> float:
+        df = len(self.postings.get(term, ()))
+        n = len(self.doc_lengths)
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def search(self, query: str, limit: Optional[int] = None, match_all: bool = True) -> List[Tuple[str, float]]:
+        """
+        Return (doc_id, score) sorted by BM25 score.
+        match_all requires every query word; the last word also matches as a prefix.
+        """
+        words = tokenize(query)
+        if not words or not self.doc_lengths:
+            return []
+
+        # Each query word becomes a group of alternative terms (exact, or prefix for the last word)
+        groups: List[List[str]] = []
+        unique_words = list(dict.fromkeys(words))
+        for i, word in enumerate(unique_words):
+            alternatives = [word] if word in self.postings else []
+            if i == len(unique_words) - 1 and len(word) >= 3:
+                alternatives = list(dict.fromkeys(alternatives + self._expand_prefix(word)))
+            groups.append(alternatives)
+
+        candidates: Optional[Set[str]] = None
+        for alternatives in groups:
+            docs: Set[str] = set()
+            for term in alternatives:
+                docs.update(self.postings.get(term, ()))
+            if match_all:
+                candidates = docs if candidates is None else candidates & docs
+                if not candidates:
+                    return []
+            else:
+                candidates = docs if candidates is None else candidates | docs
+
+        avg_length = self.total_length / len(self.doc_lengths)
+        scores: Dict[str, float] = {}
+        for alternatives in groups:
+            for term in alternatives:
+                idf = self._idf(term)
+                for doc_id, tf in self.postings.get(term, {}).items():
+                    if doc_id not in candidates:
+                        continue
+                    norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / avg_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:limit] if limit else ranked
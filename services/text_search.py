@@ -0,0 +1,277 @@
+from typing import Optional, List, Dict, Tuple, NamedTuple, Any
+from sqlalchemy.orm import Session
+from sqlalchemy import or_, case, false, inspect, bindparam, text as sql_text
+from sqlalchemy.dialects.mysql import match as mysql_match
+from config import settings
+from models import Cafe, Facility, Collection
+from services.text_index import InvertedIndex, tokenize
+import threading
+import time
+import re
+
+
+# Searchable text of each entity as (column, weight); names weigh more than addresses/descriptions
+ENTITY_FIELDS = {
+    "cafe": (Cafe, [(Cafe.nama, 2.0), (Cafe.alamat_lengkap, 1.0)]),
+    "facility": (Facility, [(Facility.name, 2.0), (Facility.description, 1.0)]),
+    "collection": (Collection, [(Collection.name, 2.0), (Collection.description, 1.0)]),
+}
+
+# FULLTEXT indexes created by migrations/add_fulltext_index.py, on the same columns as ENTITY_FIELDS
+FULLTEXT_INDEXES = {
+    "cafe": "idx_cafe_fulltext",
+    "facility": "idx_facility_fulltext",
+    "collection": "idx_collection_fulltext",
+}
+
+# InnoDB defaults: innodb_ft_min_token_size = 3 and the built-in stopword list.
+# Such words are not indexed, requiring them ("+the*") would match nothing.
+FULLTEXT_MIN_WORD_LENGTH = 3
+FULLTEXT_STOPWORDS = {
+    "about", "are", "com", "for", "from", "how", "that", "the", "this", "was",
+    "what", "when", "where", "who", "will", "with", "und", "www",
+}
+
+
+class TextMatch(NamedTuple):
+    """Filter condition of a text search and, when the backend ranks, a score to ORDER BY desc"""
+    condition: Any
+    score: Optional[Any] = None
+
+
+class EntityTextIndex:
+    """
+    Lazily built BM25 index over the text columns of one entity.
+    Rebuilt when invalidated or older than the TTL (other workers may have written).
+    """
+
+    def __init__(self, entity: str, ttl: float = 300.0, max_docs: int = 200000):
+        self.entity = entity
+        self.ttl = ttl
+        self.max_docs = max_docs
+        self.lock = threading.Lock()
+        self.index: Optional[InvertedIndex] = None
+        self.built_at: Optional[float] = None
+        self.dirty = True
+
+    def rebuild(self, db: Session) -> None:
+        model, fields = ENTITY_FIELDS[self.entity]
+        columns = [column for column, _ in fields]
+        weights = [weight for _, weight in fields]
+
+        total = db.query(model.id).count()
+        index = None
+        if total <= self.max_docs:
+            index = InvertedIndex()
+            for row in db.query(model.id, *columns).all():
+                index.add(row[0], zip(row[1:], weights))
+
+        with self.lock:
+            self.index = index
+            self.built_at = time.monotonic()
+            self.dirty = False
+
+    def ensure(self, db: Session) -> None:
+        if self.dirty or self.built_at is None or time.monotonic() - self.built_at > self.ttl:
+            self.rebuild(db)
+
+    def invalidate(self) -> None:
+        self.dirty = True
+
+    def search(self, db: Session, text: str, limit: int, match_all: bool = True) -> Optional[List[Tuple[str, float]]]:
+        """Ranked (id, score) pairs, None when the entity is too large to index in memory"""
+        self.ensure(db)
+        with self.lock:
+            if self.index is None:
+                return None
+            return self.index.search(text, limit=limit, match_all=match_all)
+
+
+_indexes: Dict[str, EntityTextIndex] = {
+    entity: EntityTextIndex(
+        entity,
+        ttl=settings.TEXT_INDEX_TTL_SECONDS,
+        max_docs=settings.TEXT_INDEX_MAX_DOCS
+    )
+    for entity in ENTITY_FIELDS
+}
+
+
+def _like_match(entity: str, text: str, match_all: bool) -> TextMatch:
+    """Substring match on every text column (the original ILIKE behaviour)"""
+    _, fields = ENTITY_FIELDS[entity]
+    columns = [column for column, _ in fields]
+    if match_all:
+        return TextMatch(or_(*[column.ilike(f"%{text}%") for column in columns]))
+    word_conditions = [column.ilike(f"%{word}%") for word in text.split() for column in columns]
+    return TextMatch(or_(*word_conditions) if word_conditions else false())
+
+
+_fulltext_checked: Dict[str, bool] = {}
+
+
+def _fulltext_available(db: Session, entity: str) -> bool:
+    """Whether the FULLTEXT index of an entity exists (checked once per process)"""
+    if entity not in _fulltext_checked:
+        model, _ = ENTITY_FIELDS[entity]
+        indexes = inspect(db.get_bind()).get_indexes(model.__tablename__)
+        _fulltext_checked[entity] = any(index["name"] == FULLTEXT_INDEXES[entity] for index in indexes)
+    return _fulltext_checked[entity]
+
+
+def boolean_mode_query(text: str, match_all: bool = True) -> Optional[str]:
+    """
+    MySQL BOOLEAN MODE query: "kopi kenangan" -> "+kopi* +kenangan*".
+    Operator characters are stripped, unindexable words dropped. None when nothing is left.
+    """
+    words = [
+        word for word in re.findall(r"\w+", text.lower())
+        if len(word) >= FULLTEXT_MIN_WORD_LENGTH and word not in FULLTEXT_STOPWORDS
+    ]
+    if not words:
+        return None
+    prefix = "+" if match_all else ""
+    return " ".join(f"{prefix}{word}*" for word in dict.fromkeys(words))
+
+
+def _fulltext_match(db: Session, entity: str, text: str, match_all: bool) -> Optional[TextMatch]:
+    against = boolean_mode_query(text, match_all)
+    if against is None or not _fulltext_available(db, entity):
+        return None
+    _, fields = ENTITY_FIELDS[entity]
+    score = mysql_match(*[column for column, _ in fields], against=against).in_boolean_mode()
+    return TextMatch(score, score)
+
+
+def ranked_match(entity: str, ranked: List[Tuple[str, float]], condition: Optional[Any] = None) -> TextMatch:
+    """
+    Condition and score from (id, score) pairs ranked outside the main query.
+    condition, when given, selects every match and `ranked` only orders the best of them
+    (the others score 0); otherwise the ranked ids are the matches.
+    """
+    model, _ = ENTITY_FIELDS[entity]
+    if condition is None:
+        if not ranked:
+            return TextMatch(false())
+        condition = model.id.in_([doc_id for doc_id, _ in ranked])
+    if not ranked:
+        return TextMatch(condition)
+    score = case({doc_id: round(s, 6) for doc_id, s in ranked}, value=model.id, else_=0.0)
+    return TextMatch(condition, score)
+
+
+_fts5_checked: Dict[str, bool] = {}
+
+
+def _fts5_available(db: Session, entity: str) -> bool:
+    """Whether database.init_sqlite_fts created the FTS5 mirror of an entity (checked once per process)"""
+    if entity not in _fts5_checked:
+        model, _ = ENTITY_FIELDS[entity]
+        _fts5_checked[entity] = db.execute(
+            sql_text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {"name": f"{model.__tablename__}_fts_keys"}
+        ).first() is not None
+    return _fts5_checked[entity]
+
+
+def fts5_query(text: str, match_all: bool = True) -> Optional[str]:
+    """
+    FTS5 MATCH query: "kopi kenangan" -> '"kopi"* AND "kenangan"*'.
+    Words are quoted so FTS5 operators in user input are taken literally. None when empty.
+    """
+    words = re.findall(r"\w+", text.lower())
+    if not words:
+        return None
+    return (" AND " if match_all else " OR ").join(f'"{word}"*' for word in dict.fromkeys(words))
+
+
+def _fts5_match(db: Session, entity: str, text: str, match_all: bool, scored: bool = True) -> Optional[TextMatch]:
+    query = fts5_query(text, match_all)
+    if query is None or not _fts5_available(db, entity):
+        return None
+    model, fields = ENTITY_FIELDS[entity]
+    fts = f"{model.__tablename__}_fts"
+    weights = ", ".join(str(weight) for _, weight in fields)
+
+    # Every match, as a subquery: filtering, totals and pagination are never truncated
+    condition = model.id.in_(
+        sql_text(
+            f"SELECT k.id FROM {fts}_keys k WHERE k.rowid IN "
+            f"(SELECT rowid FROM {fts} WHERE {fts} MATCH :fts_query)"
+        ).bindparams(bindparam("fts_query", query, unique=True)).columns(id=model.id.type)
+    )
+    if not scored:
+        return TextMatch(condition)
+
+    # bm25() is lower for better matches, negate it so the score sorts descending like the others.
+    # Only the most relevant TEXT_SEARCH_MAX_RESULTS get a score.
+    rows = db.execute(
+        sql_text(
+            f"SELECT k.id, -bm25({fts}, {weights}) AS score "
+            f"FROM {fts} JOIN {fts}_keys k ON k.rowid = {fts}.rowid "
+            f"WHERE {fts} MATCH :query ORDER BY score DESC LIMIT :limit"
+        ),
+        {"query": query, "limit": settings.TEXT_SEARCH_MAX_RESULTS}
+    ).all()
+    return ranked_match(entity, [(row[0], row[1]) for row in rows], condition)
+
+
+def _memory_match(db: Session, entity: str, text: str, match_all: bool, scored: bool = True) -> Optional[TextMatch]:
+    # Every match filters (the index is bounded by TEXT_INDEX_MAX_DOCS), the best ones get a score
+    ranked = _indexes[entity].search(db, text, limit=None, match_all=match_all)
+    if ranked is None:
+        return None
+    model, _ = ENTITY_FIELDS[entity]
+    condition = model.id.in_([doc_id for doc_id, _ in ranked]) if ranked else false()
+    if not scored:
+        return TextMatch(condition)
+    return ranked_match(entity, ranked[:settings.TEXT_SEARCH_MAX_RESULTS], condition)
+
+
+def text_match(db: Session, entity: str, text: str, match_all: bool = True, scored: bool = True) -> TextMatch:
+    """
+    Text search condition for "cafe", "facility" or "collection".
+
+    match_all requires every query word to match (the last word may be a prefix),
+    otherwise any word matches. scored=False skips ranking when only the condition is used.
+
+    Backends (TEXT_SEARCH_BACKEND, "auto" picks by dialect):
+    - "fulltext": MySQL MATCH ... AGAINST in BOOLEAN MODE on the FULLTEXT indexes, ranked
+    - "fts5": SQLite FTS5 mirror tables ranked by bm25()
+    - "memory": in-process BM25 index, ranked
+    Both match without limit; the score only ranks the best TEXT_SEARCH_MAX_RESULTS.
+    - "like": substring match, unranked
+    """
+    dialect = db.get_bind().dialect.name
+    backend = settings.TEXT_SEARCH_BACKEND
+    if backend == "auto":
+        backend = {"mysql": "fulltext", "sqlite": "fts5"}.get(dialect, "memory")
+
+    if backend == "fulltext" and dialect == "mysql":
+        matched = _fulltext_match(db, entity, text, match_all)
+        if matched is not None:
+            return matched
+        # Only short or stopwords ("di", "the") or missing index: use the in-memory index
+        backend = "memory"
+
+    if backend == "fts5" and dialect == "sqlite":
+        matched = _fts5_match(db, entity, text, match_all, scored)
+        if matched is not None:
+            return matched
+        # SQLite without FTS5: use the in-memory index
+        backend = "memory"
+
+    if backend == "memory" and tokenize(text):
+        matched = _memory_match(db, entity, text, match_all, scored)
+        if matched is not None:
+            return matched
+
+    # Stopword only queries ("di") and oversized tables keep substring matching
+    return _like_match(entity, text, match_all)
+
+
+def invalidate_text_index(entity: Optional[str] = None) -> None:
+    """Rebuild the text index of an entity (or all entities) on next search"""
+    for name, index in _indexes.items():
+        if entity is None or name == entity:
+            index.invalidate()
@@ -0,0 +1,261 @@
+from typing import Optional, List, Dict, Tuple
+from sqlalchemy.orm import Session
+from config import settings
+from database import SessionLocal
+from services.text_index import tokenize
+from services.text_search import ENTITY_FIELDS, TextMatch, ranked_match
+import importlib
+import json
+import logging
+import math
+import os
+import threading
+import time
+import zlib
+
+try:
+    import numpy as np
+except ImportError:  # Optional: semantic search falls back to text search without it
+    np = None
+
+logger = logging.getLogger(__name__)
+
+if np is None and settings.NL_SEARCH_MODE == "semantic":
+    logger.warning("NL_SEARCH_MODE is semantic but numpy is not installed: NL search uses text search")
+
+
+# Entities with a vector index (facilities are few and short, text search is enough)
+VECTOR_ENTITIES = ("cafe", "collection")
+
+
+class HashingVectorizer:
+    """
+    Dependency free text embedding: signed feature hashing of words and of
+    character trigrams (which tolerate typos and word variants: "wifii", "ngopi"/"kopi").
+
+    Hashes are crc32 based, so vectors are stable across processes and can be persisted.
+    Any object with the same `name`, `dim` and `transform(texts)` can replace it.
+    """
+
+    def __init__(self, dim: int = 512, trigram_weight: float = 0.5):
+        self.dim = dim
+        self.trigram_weight = trigram_weight
+        self.name = f"hashing-{dim}"
+
+    def _features(self, text: str) -> Dict[str, float]:
+        """Feature -> weight, with sublinear term frequency (1 + log tf)"""
+        counts: Dict[str, int] = {}
+        for word in tokenize(text):
+            counts["w:" + word] = counts.get("w:" + word, 0) + 1
+            padded = f"<{word}>"
+            for i in range(len(padded) - 2):
+                counts["c:" + padded[i:i + 3]] = counts.get("c:" + padded[i:i + 3], 0) + 1
+        return {
+            feature: (1.0 if feature[0] == "w" else self.trigram_weight) * (1.0 + math.log(count))
+            for feature, count in counts.items()
+        }
+
+    def transform(self, texts: List[str]) -> "np.ndarray":
+        """L2 normalized float32 matrix, one row per text (zero rows for empty texts)"""
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, weight in self._features(text or "").items():
+                h = zlib.crc32(feature.encode("utf-8"))
+                matrix[row, h % self.dim] += weight if h & 0x80000000 else -weight
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.where(norms == 0, 1.0, norms)
+
+
+def load_vectorizer(spec: str):
+    """VECTOR_MODEL: "hashing" or "package.module:factory" of a local model with transform(texts)"""
+    if spec == "hashing":
+        return HashingVectorizer(dim=settings.VECTOR_DIM)
+    module_name, _, attr = spec.partition(":")
+    return getattr(importlib.import_module(module_name), attr)()
+
+
+class VectorIndex:
+    """
+    Embeddings of one entity as a float32 matrix saved with np.save and memory-mapped back,
+    so workers share the pages and a restart does not re-embed.
+
+    Rebuilt when invalidated or older than the TTL, on a background thread with its own
+    session: searches never wait for it and keep using the previous index meanwhile.
+    A newer file written by another worker is loaded instead of rebuilding.
+    """
+
+    def __init__(self, entity: str, directory: str, ttl: float = 300.0, batch_rows: int = 65536):
+        self.entity = entity
+        self.directory = directory
+        self.ttl = ttl
+        self.batch_rows = batch_rows
+        self.lock = threading.Lock()
+        self.build_lock = threading.Lock()
+        self.vectorizer = None
+        self.matrix = None
+        self.ids: List[str] = []
+        self.loaded_mtime: Optional[float] = None
+        self.dirty = False
+
+    def _path(self, suffix: str) -> str:
+        return os.path.join(self.directory, f"{self.entity}.{suffix}")
+
+    def _get_vectorizer(self):
+        if self.vectorizer is None:
+            self.vectorizer = load_vectorizer(settings.VECTOR_MODEL)
+        return self.vectorizer
+
+    def _embed(self, rows: List[tuple]) -> "np.ndarray":
+        """Weighted sum of the field embeddings, names weigh more like in the text index"""
+        _, fields = ENTITY_FIELDS[self.entity]
+        vectorizer = self._get_vectorizer()
+        matrix = np.zeros((len(rows), vectorizer.dim), dtype=np.float32)
+        for i, (_, weight) in enumerate(fields):
+            matrix += weight * vectorizer.transform([row[i + 1] or "" for row in rows])
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.where(norms == 0, 1.0, norms)
+
+    def rebuild(self, db: Session) -> None:
+        # Cleared before reading, so an invalidation during the build schedules another one
+        self.dirty = False
+        model, fields = ENTITY_FIELDS[self.entity]
+        rows = db.query(model.id, *[column for column, _ in fields]).all()
+        os.makedirs(self.directory, exist_ok=True)
+
+        # Embedded batch by batch straight into the file, then renamed: a reader never maps a half written file
+        tmp = self._path(f"{os.getpid()}.tmp")
+        matrix = np.lib.format.open_memmap(
+            tmp + ".npy", mode="w+", dtype=np.float32, shape=(len(rows), self._get_vectorizer().dim)
+        )
+        for start in range(0, len(rows), self.batch_rows):
+            matrix[start:start + self.batch_rows] = self._embed(rows[start:start + self.batch_rows])
+        matrix.flush()
+        del matrix
+        with open(tmp + ".json", "w") as f:
+            json.dump({"model": self._get_vectorizer().name, "ids": [row[0] for row in rows]}, f)
+        os.replace(tmp + ".json", self._path("json"))
+        os.replace(tmp + ".npy", self._path("npy"))
+        self._load()
+
+    def _load(self) -> bool:
+        """Map the saved index; False when missing or made by another model"""
+        try:
+            mtime = os.path.getmtime(self._path("npy"))
+            with open(self._path("json")) as f:
+                meta = json.load(f)
+            # An empty file can't be mapped, it is loaded as is
+            matrix = np.load(self._path("npy"), mmap_mode="r" if os.path.getsize(self._path("npy")) > 128 else None)
+        except (OSError, ValueError):
+            return False
+        if meta.get("model") != self._get_vectorizer().name or matrix.shape[0] != len(meta["ids"]):
+            return False
+
+        with self.lock:
+            self.matrix = matrix
+            self.ids = meta["ids"]
+            self.loaded_mtime = mtime
+        return True
+
+    def _rebuild_in_background(self) -> None:
+        """Start a rebuild on its own thread and session, unless one is already running"""
+        if not self.build_lock.acquire(blocking=False):
+            return
+
+        def run():
+            db = SessionLocal()
+            try:
+                self.rebuild(db)
+            except Exception:
+                logger.exception("Rebuilding the %s vector index failed", self.entity)
+            finally:
+                db.close()
+                self.build_lock.release()
+
+        threading.Thread(target=run, name=f"vector-index-{self.entity}", daemon=True).start()
+
+    def ensure(self) -> bool:
+        """
+        Load a fresh index file or schedule a rebuild, without touching the database here
+        (callers may run inside AsyncSession.run_sync on the event loop thread).
+        Returns whether an index, possibly the previous one, can be searched.
+        """
+        if not self.dirty:
+            try:
+                mtime = os.path.getmtime(self._path("npy"))
+            except OSError:
+                mtime = None
+            fresh = mtime is not None and time.time() - mtime <= self.ttl
+            if fresh and (mtime == self.loaded_mtime or self._load()):
+                return True
+        self._rebuild_in_background()
+        return self.matrix is not None
+
+    def invalidate(self) -> None:
+        self.dirty = True
+
+    def search(self, text: str, k: int, min_score: float = 0.0) -> Optional[List[Tuple[str, float]]]:
+        """Top k (id, cosine similarity) pairs, best first; None until a first index is built"""
+        if not self.ensure():
+            return None
+        query = self._get_vectorizer().transform([text])[0]
+        if not query.any():
+            return []
+
+        with self.lock:
+            matrix, ids = self.matrix, self.ids
+
+        # Score the mapped matrix in row batches, keeping each batch's top k
+        best_rows = np.empty(0, dtype=np.int64)
+        best_scores = np.empty(0, dtype=np.float32)
+        for start in range(0, matrix.shape[0], self.batch_rows):
+            scores = np.asarray(matrix[start:start + self.batch_rows]) @ query
+            if scores.shape[0] > k:
+                top = np.argpartition(-scores, k - 1)[:k]
+            else:
+                top = np.arange(scores.shape[0])
+            best_rows = np.concatenate([best_rows, top + start])
+            best_scores = np.concatenate([best_scores, scores[top]])
+
+        order = np.argsort(-best_scores)[:k]
+        return [
+            (ids[best_rows[i]], float(best_scores[i]))
+            for i in order
+            if best_scores[i] > min_score
+        ]
+
+
+_indexes: Dict[str, VectorIndex] = {
+    entity: VectorIndex(
+        entity,
+        directory=settings.VECTOR_INDEX_DIR,
+        ttl=settings.VECTOR_INDEX_TTL_SECONDS
+    )
+    for entity in VECTOR_ENTITIES
+}
+
+
+def vector_search_available(entity: str) -> bool:
+    return np is not None and entity in _indexes
+
+
+def vector_match(db: Session, entity: str, text: str) -> Optional[TextMatch]:
+    """
+    Semantic counterpart of text_match: the VECTOR_SEARCH_TOP_K most similar rows as an
+    id condition with their similarity as score. None when numpy or the entity index is
+    missing, or while the first index is still being built: callers fall back to text_match.
+    """
+    if not vector_search_available(entity):
+        return None
+    ranked = _indexes[entity].search(
+        text, k=settings.VECTOR_SEARCH_TOP_K, min_score=settings.VECTOR_MIN_SCORE
+    )
+    if ranked is None:
+        return None
+    return ranked_match(entity, ranked)
+
+
+def invalidate_vector_index(entity: Optional[str] = None) -> None:
+    """Re-embed an entity (or all entities) on next search"""
+    for name, index in _indexes.items():
+        if entity is None or name == entity:
+            index.invalidate()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Fake Groq Server for Bocah Cafe API
+===================================
+
+A local OpenAI compatible chat completions endpoint whose behaviour is chosen by
+the API key, to exercise the hedging and circuit breakers of AsyncGroqBalancer
+without real keys.
+
+Usage:
+    python simulate_groq.py                              # Run the scenarios below and print key stats
+    python simulate_groq.py --keys ok,slow-2,fail        # Same, with other keys
+    python simulate_groq.py --serve --port 8765          # Only serve, e.g. for the API:
+        GROQ_BASE_URL=http://127.0.0.1:8765 GROQ_API_KEYS=slow-2,ok uvicorn main:app
+
+Keys:
+    - ok          : answers right away
+    - slow-<s>    : answers after <s> seconds (a hedge should win)
+    - fail        : always answers 500 (its breaker should open)
+    - flaky-<p>   : answers 500 with probability <p>, e.g. flaky-0.5
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from services.groq_client import AsyncGroqBalancer, GroqUnavailableError
+
+DEFAULT_KEYS = "ok,slow-2,fail,flaky-0.5"
+
+
+class FakeGroqHandler(BaseHTTPRequestHandler):
+    """POST /openai/v1/chat/completions, behaving as the bearer key says"""
+
+    def do_POST(self):
+        key = self.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        if key.startswith("slow-"):
+            time.sleep(float(key[len("slow-"):]))
+        failing = key == "fail" or (
+            key.startswith("flaky-") and random.random() < float(key[len("flaky-"):])
+        )
+        if failing:
+            self._reply(500, {"error": {"message": f"{key} failed", "type": "server_error"}})
+            return
+
+        self._reply(200, {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": "fake",
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": json.dumps({"answered_by": key})},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        })
+
+    def _reply(self, status: int, body: dict):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        try:
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The balancer cancelled this call after a hedge won
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(port: int) -> ThreadingHTTPServer:
+    """Serve the fake endpoint on a background thread"""
+    server = ThreadingHTTPServer(("127.0.0.1", port), FakeGroqHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def print_stats(balancer: AsyncGroqBalancer, keys: list):
+    for stat in balancer.stats():
+        print(f"    {keys[stat['key']]:<12} {stat['state']:<10} "
+              f"latency {stat['latency_ms']:>7}ms  calls {stat['calls']:>3}  failures {stat['failures']:>3}")
+
+
+async def run_scenarios(base_url: str, keys: list, requests: int, reset_timeout: float):
+    """Sequential then concurrent completions, then a wait for the breakers to half-open"""
+    balancer = AsyncGroqBalancer(
+        keys, base_url=base_url, timeout=5.0, hedge_after=0.3, reset_timeout=reset_timeout
+    )
+
+    async def one():
+        started = time.monotonic()
+        try:
+            response = await balancer.create_completion(
+                model="fake", messages=[{"role": "user", "content": "kopi wifi"}]
+            )
+            winner = json.loads(response.choices[0].message.content)["answered_by"]
+        except GroqUnavailableError as e:
+            winner = f"unavailable ({e})"
+        return winner, time.monotonic() - started
+
+    print(f"\n{requests} sequential completions:")
+    for _ in range(requests):
+        winner, elapsed = await one()
+        print(f"    {elapsed * 1000:7.1f}ms  {winner}")
+    print_stats(balancer, keys)
+
+    print(f"\n{requests} concurrent completions:")
+    results = await asyncio.gather(*(one() for _ in range(requests)))
+    for winner, elapsed in results:
+        print(f"    {elapsed * 1000:7.1f}ms  {winner}")
+    print_stats(balancer, keys)
+
+    print(f"\nAfter {reset_timeout}s open circuits let one probe through:")
+    await asyncio.sleep(reset_timeout)
+    for _ in range(3):
+        await one()
+    print_stats(balancer, keys)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Groq server for hedging and breaker checks")
+    parser.add_argument("--keys", default=DEFAULT_KEYS, help=f"Comma separated fake keys (default: {DEFAULT_KEYS})")
+    parser.add_argument("--port", type=int, default=8765, help="Port to serve on")
+    parser.add_argument("--requests", type=int, default=10, help="Completions per scenario")
+    parser.add_argument("--reset", type=float, default=2.0, help="Breaker reset timeout in seconds")
+    parser.add_argument("--serve", action="store_true", help="Only run the server")
+    args = parser.parse_args()
+
+    server = start_server(args.port)
+    base_url = f"http://127.0.0.1:{args.port}"
+    print(f"Fake Groq server on {base_url}")
+
+    if args.serve:
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+        server.server_close()
+        return
+
+    keys = [key.strip() for key in args.keys.split(",") if key.strip()]
+    asyncio.run(run_scenarios(base_url, keys, args.requests, args.reset))
+    server.shutdown()
+    server.server_close()
+
+
+if __name__ == "__main__":
+    main()